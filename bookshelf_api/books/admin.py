@@ -1,6 +1,18 @@
 from django.contrib import admin
-from .models import Genre, Books
+from .models import Genre, Books, ArchivedBook, CoverBlob, MediaJob
+
+
+class BooksAdmin(admin.ModelAdmin):
+    # Staff can see and restore soft-deleted books
+    list_display = ['title', 'author', 'is_available', 'is_deleted', 'created_at']
+    list_filter = ['is_deleted', 'is_available']
+
+    def get_queryset(self, request):
+        return Books.all_objects.all()
 
 
 admin.site.register(Genre)
-admin.site.register(Books)
\ No newline at end of file
+admin.site.register(Books, BooksAdmin)
+admin.site.register(ArchivedBook)
+admin.site.register(MediaJob)
+admin.site.register(CoverBlob)
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+import time
+from bookshelf_api.local_cache import TTLCache
+from bookshelf_api.response_cache import VersionedResponseCache
+
+
+# Genre name -> id. Cleared by the Genre save/delete signals (books.signals)
+genre_cache = TTLCache(maxsize=settings.GENRE_CACHE_MAX_SIZE, ttl=settings.GENRE_CACHE_TTL_SECONDS)
+
+# Serialized BookListView pages, shared by all users. Invalidated on commit of any
+# change visible in the catalog: book writes, imports, cover updates and genre edits.
+catalog_cache = VersionedResponseCache('books:catalog', alias='catalog', timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+
+class BookDetailCache:
+    # Read-through cache of serialized books by slug. Slugs that do not resolve are
+    # cached too (for a shorter time) so repeated misses do not reach the database.
+    #
+    # Entries are keyed by a version, like catalog_cache: writers bump the slug's version
+    # on commit instead of deleting the entry. A reader that loaded the book before the
+    # write committed stores its copy under the version it started with, which nobody
+    # reads any more. Renaming a genre or an author bumps a generation shared by all
+    # slugs, since every detail embeds those names. Versions are stored without a
+    # timeout so that entries are only orphaned by writes.
+    NOT_FOUND = 'not-found'
+    GENERATION_KEY = 'books:detail:generation'
+
+    def __init__(self, alias, timeout, negative_timeout):
+        self.alias = alias
+        self.timeout = timeout
+        self.negative_timeout = negative_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def version_key(slug):
+        return f'books:detail:{slug}:version'
+
+    def get_version(self, slug):
+        # A missing version (never set, or evicted) starts a new one, orphaning old entries
+        versions = self.cache.get_many([self.GENERATION_KEY, self.version_key(slug)])
+        missing = {key: time.time_ns() for key in [self.GENERATION_KEY, self.version_key(slug)] if key not in versions}
+        if missing:
+            self.cache.set_many(missing, None)
+            versions.update(missing)
+        return f'{versions[self.GENERATION_KEY]}.{versions[self.version_key(slug)]}'
+
+    @staticmethod
+    def key(slug, version):
+        return f'books:detail:{slug}:{version}'
+
+    def get_or_load(self, slug, loader):
+        # Returns the cached data, or None for a slug known not to exist
+        key = self.key(slug, self.get_version(slug))
+        data = self.cache.get(key)
+        if data is None:
+            data = loader()
+            if data is None:
+                self.cache.set(key, self.NOT_FOUND, self.negative_timeout)
+            else:
+                self.cache.set(key, data, self.timeout)
+        return None if data == self.NOT_FOUND else data
+
+    def invalidate(self, *slugs):
+        keys = [self.version_key(slug) for slug in slugs if slug]
+        if keys:
+            transaction.on_commit(lambda: self.cache.set_many({key: time.time_ns() for key in keys}, None))
+
+    def invalidate_all(self):
+        transaction.on_commit(lambda: self.cache.set(self.GENERATION_KEY, time.time_ns(), None))
+
+
+book_detail_cache = BookDetailCache(
+    alias='catalog', timeout=settings.BOOK_DETAIL_CACHE_TIMEOUT, negative_timeout=settings.BOOK_DETAIL_NEGATIVE_CACHE_TIMEOUT
+)
+
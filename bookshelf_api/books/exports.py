@@ -0,0 +1,41 @@
+from django.core.serializers.json import DjangoJSONEncoder
+import csv
+
+
+EXPORT_FIELDS = [
+    'id', 'title', 'slug', 'author', 'genre', 'description', 'pages', 'published_date',
+    'is_available', 'cover_image', 'created_at', 'updated_at',
+]
+# Rows are buffered and sent in blocks so the response is not one tiny write per book
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    # csv.writer needs a file; this one hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def stream_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    buffer = []
+    for row in rows:
+        buffer.append(encoder.encode(dict(zip(EXPORT_FIELDS, row))))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow(row))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,101 @@
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+import hashlib, io
+
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP", "BMP", "TIFF"}
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+MAX_DIMENSION = 8000
+MAX_PIXELS = 40_000_000
+
+# Largest first: each variant is resized from the previous one
+COVER_VARIANTS = {
+    'full': (1200, 1800),
+    'card': (400, 600),
+    'thumbnail': (150, 225),
+}
+OUTPUT_FORMATS = {
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+class InvalidCoverImage(ValueError):
+    pass
+
+
+class ProcessedCover:
+    def __init__(self, name, content_hash, source_format, width, height, variants, extension):
+        self.name = name
+        self.content_hash = content_hash
+        self.source_format = source_format
+        self.width = width
+        self.height = height
+        self.variants = variants
+        self.extension = extension
+
+    def file_name(self, variant):
+        return f"{self.name}-{variant}.{self.extension}"
+
+
+def process_cover_image(upload):
+    # Header checks run before any pixel data is decoded, so oversized or bogus
+    # files are rejected cheaply. The image is then decoded exactly once.
+    if getattr(upload, 'size', 0) > MAX_UPLOAD_BYTES:
+        raise InvalidCoverImage("Image file size must be less than 5MB")
+
+    # Hash while streaming the upload so identical covers can be stored once
+    hasher = hashlib.sha256()
+    buffer = io.BytesIO()
+    for chunk in upload.chunks():
+        hasher.update(chunk)
+        buffer.write(chunk)
+    buffer.seek(0)
+
+    try:
+        image = Image.open(buffer)
+        if image.format not in ALLOWED_FORMATS:
+            raise InvalidCoverImage(f"Invalid image format: {image.format}.")
+        width, height = image.size
+        if width > MAX_DIMENSION or height > MAX_DIMENSION or width * height > MAX_PIXELS:
+            raise InvalidCoverImage(f"Image dimensions must be at most {MAX_DIMENSION}x{MAX_DIMENSION} pixels")
+
+        source_format = image.format
+        # JPEG can decode straight at a reduced scale when the output is much smaller
+        image.draft('RGB', COVER_VARIANTS['full'])
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError, SyntaxError) as e:
+        raise InvalidCoverImage(f"Invalid image file: {e}")
+
+    image = ImageOps.exif_transpose(image)
+    output_format = settings.COVER_IMAGE_FORMAT
+    extension, save_options = OUTPUT_FORMATS[output_format]
+    image = normalize_mode(image, output_format)
+
+    variants = {}
+    for variant, size in COVER_VARIANTS.items():
+        if image.width > size[0] or image.height > size[1]:
+            image = resize(image, size)
+        buffer = io.BytesIO()
+        image.save(buffer, output_format, **save_options)
+        variants[variant] = buffer.getvalue()
+
+    name = (getattr(upload, 'name', '') or 'cover').rsplit('.', 1)[0][:100]
+    return ProcessedCover(name, hasher.hexdigest(), source_format, width, height, variants, extension)
+
+
+def resize(image, size):
+    image = image.copy()
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def normalize_mode(image, output_format):
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if has_alpha and output_format == 'WEBP':
+        return image.convert('RGBA')
+    if has_alpha:
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+        return background
+    return image.convert('RGB')
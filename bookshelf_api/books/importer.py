@@ -0,0 +1,279 @@
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+import csv, json, os, time
+from .models import Books, book_slug
+from .caches import book_detail_cache, catalog_cache
+from .services import BOOK_SEARCH_VECTOR, BookFacetService, GenreService
+from .signals import books_updated
+
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+class RejectedRow(ValueError):
+    pass
+
+
+def read_rows(path, file_format):
+    # Yields (record number, row dict) without loading the file into memory
+    with open(path, newline='', encoding='utf-8-sig') as source:
+        if file_format == 'csv':
+            yield from enumerate(csv.DictReader(source), start=1)
+            return
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {'_raw': line.rstrip('\n'), '_error': f"Invalid JSON: {e}"}
+            if not isinstance(row, dict):
+                row = {'_raw': line.rstrip('\n'), '_error': "Each line must be a JSON object"}
+            yield number, row
+
+
+class RejectsWriter:
+    # Rejected rows are written in the input format with an extra `error` field,
+    # so the file can be corrected and imported again as is.
+    def __init__(self, path, file_format, append):
+        self.file_format = file_format
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = None
+        self.count = 0
+
+    def write(self, row, error):
+        if self.file_format == 'csv':
+            if self.writer is None:
+                fieldnames = [name for name in row if name is not None] + ['error']
+                self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction='ignore')
+                if self.file.tell() == 0:
+                    self.writer.writeheader()
+            self.writer.writerow({**row, 'error': error})
+        else:
+            record = {key: value for key, value in row.items() if not key.startswith('_')}
+            if '_raw' in row:
+                record['raw'] = row['_raw']
+            self.file.write(json.dumps({**record, 'error': error}, default=str) + '\n')
+        self.count += 1
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class BookImporter:
+    def __init__(self, batch_size=1000, default_author=None, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.default_author = default_author
+        self.authors = {}
+        self.imported = 0
+        self.rejected = 0
+        # Every title and slug accepted so far in this run. Earlier batches are in the
+        # database too, except in a dry run, where nothing is written.
+        self.seen_titles = set()
+        self.seen_slugs = set()
+
+    def clean(self, row):
+        if '_error' in row:
+            raise RejectedRow(row['_error'])
+
+        title = str(row.get('title') or '').strip()
+        if not title:
+            raise RejectedRow("Title cannot be empty")
+        if len(title) > 255:
+            raise RejectedRow("Title must be 255 characters or less")
+
+        genre = str(row.get('genre') or '').strip()
+        if not genre:
+            raise RejectedRow("Genre cannot be empty")
+        if len(genre) > 100:
+            raise RejectedRow("Genre name must be 100 characters or less")
+
+        try:
+            pages = int(str(row.get('pages') or '').strip())
+        except ValueError:
+            raise RejectedRow("Pages must be a whole number")
+        if pages <= 0:
+            raise RejectedRow("Pages cannot be less than 1")
+
+        try:
+            published_date = parse_date(str(row.get('published_date') or '').strip())
+        except ValueError:
+            published_date = None
+        if published_date is None:
+            raise RejectedRow("Published date must be in YYYY-MM-DD format")
+        if published_date > date.today():
+            raise RejectedRow("Published date cannot be in the future")
+
+        is_available = str(row.get('is_available', '') or '').strip().lower()
+        if is_available and is_available not in TRUE_VALUES | FALSE_VALUES:
+            raise RejectedRow("is_available must be true or false")
+
+        author = str(row.get('author') or '').strip() or self.default_author
+        if not author:
+            raise RejectedRow("Author is required")
+
+        return {
+            'title': title,
+            'slug': book_slug(title) or None,
+            'description': str(row.get('description') or ''),
+            'pages': pages,
+            'genre': genre,
+            'published_date': published_date,
+            'is_available': is_available not in FALSE_VALUES,
+            'author': author,
+        }
+
+    def resolve_authors(self, usernames):
+        missing = set(usernames) - self.authors.keys()
+        if missing:
+            found = dict(get_user_model().objects.filter(username__in=missing).values_list('username', 'id'))
+            self.authors.update({username: found.get(username) for username in missing})
+
+    def import_batch(self, batch, rejects):
+        # batch: list of (raw row, cleaned row)
+        self.resolve_authors(cleaned['author'] for _, cleaned in batch)
+
+        accepted = []
+        titles, slugs = set(), set()
+        for row, cleaned in batch:
+            if self.authors.get(cleaned['author']) is None:
+                rejects.append((row, f"Unknown author: {cleaned['author']}"))
+            elif cleaned['title'] in self.seen_titles or (cleaned['slug'] and cleaned['slug'] in self.seen_slugs):
+                rejects.append((row, "Duplicate title in import file"))
+            else:
+                titles.add(cleaned['title'])
+                self.seen_titles.add(cleaned['title'])
+                if cleaned['slug']:
+                    slugs.add(cleaned['slug'])
+                    self.seen_slugs.add(cleaned['slug'])
+                accepted.append((row, cleaned))
+
+        for attempt in range(3):
+            existing = Books.objects.filter(Q(title__in=titles) | Q(slug__in=slugs)).values_list('title', 'slug')
+            taken_titles, taken_slugs = set(), set()
+            for title, slug in existing:
+                taken_titles.add(title)
+                taken_slugs.add(slug)
+
+            new_rows = []
+            for row, cleaned in accepted:
+                if cleaned['title'] in taken_titles:
+                    rejects.append((row, "A book with this title already exists"))
+                elif cleaned['slug'] and cleaned['slug'] in taken_slugs:
+                    rejects.append((row, "A book with this slug already exists"))
+                else:
+                    new_rows.append((row, cleaned))
+            accepted = new_rows
+
+            if self.dry_run:
+                return len(accepted)
+            try:
+                return self.write(cleaned for _, cleaned in accepted)
+            except IntegrityError:
+                # A title was taken by a concurrent writer since the check; check again
+                if attempt == 2:
+                    raise
+
+    def write(self, rows):
+        rows = list(rows)
+        return GenreService.write_with_genres({cleaned['genre'] for cleaned in rows}, lambda genres: self.insert(rows, genres))
+
+    def insert(self, rows, genres):
+        books = Books.objects.bulk_create([
+            Books(
+                title=cleaned['title'],
+                slug=cleaned['slug'],
+                description=cleaned['description'],
+                pages=cleaned['pages'],
+                genre_id=genres[cleaned['genre']],
+                author_id=self.authors[cleaned['author']],
+                published_date=cleaned['published_date'],
+                is_available=cleaned['is_available'],
+            )
+            for cleaned in rows
+        ], batch_size=self.batch_size)
+
+        # Same fallback as Books.save() for titles without any slug characters
+        slugless = [book.pk for book in books if not book.slug]
+        for pk in slugless:
+            Books.objects.filter(pk=pk).update(slug=f"book-{pk}")
+        if slugless:
+            books_updated.send(sender=Books, book_ids=slugless)
+        if connection.vendor == 'postgresql':
+            Books.objects.filter(pk__in=[book.pk for book in books]).update(search_vector=BOOK_SEARCH_VECTOR)
+        BookFacetService.record_change([], [value for book in books for value in BookFacetService.facet_values(book)])
+        catalog_cache.invalidate_on_commit()
+        book_detail_cache.invalidate(*(cleaned['slug'] for cleaned in rows))
+        return len(books)
+
+    def run(self, rows, rejects_writer, on_batch=None, start_after=0):
+        batch, rejects = [], []
+        last_number = start_after
+
+        def flush():
+            imported = self.import_batch(batch, rejects) if batch else 0
+            for row, error in rejects:
+                rejects_writer.write(row, error)
+            rejects_writer.flush()
+            self.imported += imported
+            self.rejected += len(rejects)
+            batch.clear()
+            rejects.clear()
+            if on_batch:
+                on_batch(last_number)
+
+        for number, row in rows:
+            if number <= start_after:
+                continue
+            last_number = number
+            try:
+                batch.append((row, self.clean(row)))
+            except RejectedRow as e:
+                rejects.append((row, str(e)))
+            if len(batch) + len(rejects) >= self.batch_size:
+                flush()
+        flush()
+
+
+class Checkpoint:
+    # Records the last input record whose batch was committed; written atomically
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('source') != self.source:
+            raise ValueError(f"Checkpoint {self.path} belongs to another file: {state.get('source')}")
+        return state
+
+    def save(self, record, imported, rejected):
+        state = {
+            'source': self.source,
+            'record': record,
+            'imported': imported,
+            'rejected': rejected,
+            'saved_at': time.time(),
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
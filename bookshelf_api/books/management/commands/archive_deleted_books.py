@@ -0,0 +1,27 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+import time
+from books.services import BookArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move books soft-deleted longer than the retention window into the archive table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.BOOK_ARCHIVE_RETENTION_DAYS, help="Days a deleted book is kept in place")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Books moved per transaction")
+        parser.add_argument('--pause', type=float, default=0.1, help="Seconds to sleep between chunks")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['retention_days'])
+        total = 0
+        while True:
+            archived = BookArchiveService.archive_batch(cutoff, options['chunk_size'])
+            if not archived:
+                break
+            total += archived
+            self.stdout.write(f"Archived {total} book(s)")
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} book(s) archived"))
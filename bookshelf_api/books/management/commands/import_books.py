@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+import os, time
+from books.importer import BookImporter, Checkpoint, RejectsWriter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import books from a CSV or JSONL file in batches, with resumable checkpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header row) or JSONL file")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format; guessed from the file extension by default")
+        parser.add_argument('--author', help="Username used for rows without an author column")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows written per transaction")
+        parser.add_argument('--checkpoint', help="Checkpoint file (default: <path>.checkpoint)")
+        parser.add_argument('--rejects', help="Rejected rows report (default: <path>.rejects.<format>)")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and start from the first row")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report rejects without writing books")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f"File not found: {path}")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        checkpoint = Checkpoint(options['checkpoint'] or f"{path}.checkpoint", path)
+        rejects_path = options['rejects'] or f"{path}.rejects.{file_format}"
+
+        try:
+            state = None if options['restart'] or options['dry_run'] else checkpoint.load()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        start_after = state['record'] if state else 0
+        importer = BookImporter(
+            batch_size=options['batch_size'], default_author=options['author'], dry_run=options['dry_run']
+        )
+        if state:
+            importer.imported, importer.rejected = state['imported'], state['rejected']
+            self.stdout.write(f"Resuming after record {start_after} ({importer.imported} imported so far)")
+
+        started = time.monotonic()
+
+        def on_batch(record):
+            if not options['dry_run']:
+                checkpoint.save(record, importer.imported, importer.rejected)
+            rate = (record - start_after) / max(time.monotonic() - started, 0.001)
+            self.stdout.write(
+                f"Record {record}: {importer.imported} imported, {importer.rejected} rejected ({rate:.0f} rows/s)"
+            )
+
+        rejects = RejectsWriter(rejects_path, file_format, append=bool(state))
+        try:
+            importer.run(read_rows(path, file_format), rejects, on_batch=on_batch, start_after=start_after)
+        finally:
+            rejects.close()
+
+        if not options['dry_run']:
+            checkpoint.clear()
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {importer.imported} book(s), rejected {importer.rejected}"))
+        if importer.rejected:
+            self.stdout.write(f"Rejected rows written to {rejects_path}")
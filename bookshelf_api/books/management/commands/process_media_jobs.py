@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+import time
+from books.media import MediaJobService
+
+
+class Command(BaseCommand):
+    help = "Drain the cover media job queue (uploads, deletions and CDN invalidation)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help="Jobs claimed per batch")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Process one batch and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = MediaJobService.process_pending(limit=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Processed {processed} media job(s)")
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
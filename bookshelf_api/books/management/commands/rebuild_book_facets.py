@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from books.services import BookFacetService
+
+
+class Command(BaseCommand):
+    help = "Recount the book facet table from the catalog, or report drift with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Only report facets whose stored count is off; exit 1 on drift")
+
+    def handle(self, *args, **options):
+        drift = BookFacetService.drift() if options['verify'] else BookFacetService.rebuild()
+        for dimension, value, stored, actual in drift:
+            self.stdout.write(f"{dimension}={value}: stored {stored}, actual {actual}")
+
+        if options['verify']:
+            if drift:
+                raise CommandError(f"{len(drift)} facet(s) out of date; run without --verify to rebuild")
+            self.stdout.write(self.style.SUCCESS("Facet counts are up to date"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Facets rebuilt ({len(drift)} corrected)"))
@@ -0,0 +1,278 @@
+from datetime import timedelta
+from urllib.parse import urlparse
+from decouple import config
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import cloudinary, cloudinary.uploader, logging, posixpath, uuid
+from .caches import book_detail_cache, catalog_cache
+from .models import Books, CoverBlob, MediaJob
+
+
+logger = logging.getLogger(__name__)
+
+# Books.cover_image keeps pointing at this variant for older clients
+COVER_IMAGE_VARIANT = 'full'
+COVER_FIELDS = ['cover_image', 'cover_variants', 'cover_status', 'cover_blob', 'pending_cover_blob', 'updated_at']
+
+class CloudinaryCoverStorage:
+    def upload(self, content, name):
+        upload_result = cloudinary.uploader.upload(
+            content,
+            upload_preset=config('CLOUDINARY_UPLOAD_PRESET'),
+            resource_type='image'
+        )
+        return upload_result['secure_url']
+
+    def destroy(self, url):
+        cloudinary.uploader.destroy(self.public_id(url), invalidate=True)
+
+    @staticmethod
+    def public_id(url):
+        # .../image/upload/v1712345678/folder/name.jpg -> folder/name
+        path = urlparse(url).path.split('/upload/', 1)[-1]
+        parts = path.split('/')
+        if parts[0].startswith('v') and parts[0][1:].isdigit():
+            parts = parts[1:]
+        return posixpath.splitext('/'.join(parts))[0]
+
+
+class LocalCoverStorage:
+    # Stores covers under MEDIA_ROOT; for local development and tests
+    def __init__(self):
+        self.storage = FileSystemStorage()
+
+    def upload(self, content, name):
+        extension = posixpath.splitext(name or '')[1].lower()
+        saved_name = self.storage.save(f'covers/{uuid.uuid4().hex}{extension}', ContentFile(content))
+        return self.storage.url(saved_name)
+
+    def destroy(self, url):
+        name = urlparse(url).path.removeprefix(self.storage.base_url)
+        self.storage.delete(name)
+
+
+def get_cover_storage():
+    return import_string(settings.COVER_STORAGE_BACKEND)()
+
+
+class CoverService:
+    # Covers are stored once per distinct upload (CoverBlob, keyed by the SHA-256 of the
+    # uploaded bytes) and shared by every book using them. Books hold a reference to the
+    # blob they display and, while a new cover is being stored, to the pending one.
+    @staticmethod
+    def attach(book, cover):
+        blob, created = CoverBlob.objects.select_for_update().get_or_create(content_hash=cover.content_hash)
+        retrying = blob.status == CoverBlob.Status.FAILED
+        if blob.pk in (book.cover_blob_id, book.pending_cover_blob_id) and not retrying:
+            return
+
+        # A failed upload sent again for the same book already holds its reference
+        referenced = blob.pk == book.pending_cover_blob_id
+        if not referenced:
+            CoverBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        if created or retrying:
+            blob.status = CoverBlob.Status.PENDING
+            blob.variants = {}
+            blob.save(update_fields=['status', 'variants', 'updated_at'])
+            MediaJobService.enqueue_upload(blob, cover)
+
+        if book.pending_cover_blob_id and not referenced:
+            CoverService.release(book.pending_cover_blob_id)
+            book.pending_cover_blob = None
+
+        if blob.status == CoverBlob.Status.READY:
+            # Same bytes were stored before: no upload at all
+            CoverService.show(book, blob)
+            book.save(update_fields=COVER_FIELDS)
+        else:
+            book.pending_cover_blob = blob
+            book.cover_status = Books.CoverStatus.PENDING
+            # The displayed cover is unchanged, so reading list projections need no sync
+            book.save(update_fields=['cover_status', 'pending_cover_blob', 'updated_at'])
+
+    @staticmethod
+    def show(book, blob):
+        old_blob_id = book.cover_blob_id
+        # Covers stored before deduplication have no blob and belong to this book alone
+        legacy_urls = set() if old_blob_id else {book.cover_image, *book.cover_variants.values()} - {None, ''}
+
+        book.cover_blob = blob
+        book.cover_image = blob.variants.get(COVER_IMAGE_VARIANT)
+        book.cover_variants = blob.variants
+        book.cover_status = Books.CoverStatus.READY
+        if book.pending_cover_blob_id == blob.pk:
+            book.pending_cover_blob = None
+
+        catalog_cache.invalidate_on_commit()
+        book_detail_cache.invalidate(book.slug)
+        if old_blob_id:
+            CoverService.release(old_blob_id)
+        MediaJobService.enqueue_destroys(legacy_urls, book=book)
+
+    @staticmethod
+    def detach(book):
+        # For books removed for good: drop their blob references and legacy files
+        for blob_id in {book.cover_blob_id, book.pending_cover_blob_id} - {None}:
+            CoverService.release(blob_id)
+        if not book.cover_blob_id:
+            MediaJobService.enqueue_destroys({book.cover_image, *book.cover_variants.values()} - {None, ''})
+
+    @staticmethod
+    def release(blob_id):
+        blob = CoverBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            CoverBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1, updated_at=timezone.now())
+            return
+
+        # Last reference gone: stop pending uploads and delete what was already stored
+        MediaJob.objects.filter(
+            blob=blob, status__in=[MediaJob.Status.PENDING, MediaJob.Status.RUNNING]
+        ).update(status=MediaJob.Status.CANCELLED, payload=None, updated_at=timezone.now())
+        MediaJobService.enqueue_destroys(blob.variants.values())
+        blob.delete()
+
+    @staticmethod
+    def complete_variant(blob, variant, url, job):
+        blob.variants = {**blob.variants, variant: url}
+        remaining = MediaJob.objects.filter(
+            blob=blob, action=MediaJob.Action.UPLOAD, status__in=[MediaJob.Status.PENDING, MediaJob.Status.RUNNING]
+        ).exclude(pk=job.pk)
+        if not remaining.exists():
+            blob.status = CoverBlob.Status.READY
+        blob.save(update_fields=['variants', 'status', 'updated_at'])
+
+        if blob.status == CoverBlob.Status.READY:
+            for book in Books.all_objects.select_for_update().filter(pending_cover_blob=blob):
+                CoverService.show(book, blob)
+                book.save(update_fields=COVER_FIELDS)
+
+    @staticmethod
+    def fail(blob):
+        MediaJob.objects.filter(
+            blob=blob, status__in=[MediaJob.Status.PENDING, MediaJob.Status.RUNNING]
+        ).update(status=MediaJob.Status.CANCELLED, payload=None, updated_at=timezone.now())
+        MediaJobService.enqueue_destroys(blob.variants.values())
+        blob.status = CoverBlob.Status.FAILED
+        blob.variants = {}
+        blob.save(update_fields=['status', 'variants', 'updated_at'])
+        books = list(Books.all_objects.filter(pending_cover_blob=blob).values_list('pk', 'slug'))
+        book_detail_cache.invalidate(*(slug for _, slug in books))
+        book_ids = [pk for pk, _ in books]
+        Books.all_objects.filter(pk__in=book_ids).update(cover_status=Books.CoverStatus.FAILED, updated_at=timezone.now())
+        catalog_cache.invalidate_on_commit()
+
+
+class MediaJobService:
+    @staticmethod
+    def enqueue_upload(blob, cover):
+        return MediaJob.objects.bulk_create([
+            MediaJob(
+                blob=blob,
+                action=MediaJob.Action.UPLOAD,
+                variant=variant,
+                payload=content,
+                file_name=cover.file_name(variant),
+            )
+            for variant, content in cover.variants.items()
+        ])
+
+    @staticmethod
+    def enqueue_destroy(url, book=None):
+        return MediaJob.objects.create(book=book, action=MediaJob.Action.DESTROY, target=url)
+
+    @staticmethod
+    def enqueue_destroys(urls, book=None):
+        return MediaJob.objects.bulk_create([
+            MediaJob(book=book, action=MediaJob.Action.DESTROY, target=url) for url in urls
+        ])
+
+    @staticmethod
+    def claim_jobs(limit):
+        # Jobs stay RUNNING for the lease period only; a crashed worker's jobs are picked up again
+        now = timezone.now()
+        with transaction.atomic():
+            job_ids = list(
+                MediaJob.objects.select_for_update(skip_locked=True).filter(
+                    Q(status=MediaJob.Status.PENDING) | Q(status=MediaJob.Status.RUNNING),
+                    available_at__lte=now
+                ).order_by('available_at').values_list('id', flat=True)[:limit]
+            )
+            MediaJob.objects.filter(id__in=job_ids).update(
+                status=MediaJob.Status.RUNNING,
+                attempts=F('attempts') + 1,
+                available_at=now + timedelta(seconds=settings.MEDIA_JOB_LEASE_SECONDS),
+                updated_at=now,
+            )
+        return job_ids
+
+    @staticmethod
+    def process_pending(limit=20):
+        job_ids = MediaJobService.claim_jobs(limit)
+        for job_id in job_ids:
+            MediaJobService.run_job(job_id)
+        return len(job_ids)
+
+    @staticmethod
+    def run_job(job_id):
+        job = MediaJob.objects.get(pk=job_id)
+        if job.status != MediaJob.Status.RUNNING:
+            return
+        storage = get_cover_storage()
+        try:
+            if job.action == MediaJob.Action.UPLOAD:
+                url = storage.upload(bytes(job.payload), job.file_name)
+                MediaJobService.complete_upload(job, url)
+            else:
+                storage.destroy(job.target)
+                MediaJobService.mark_done(job)
+        except Exception as e:
+            logger.error(f"Media job {job.id} ({job.action}) failed on attempt {job.attempts}: {e}")
+            MediaJobService.mark_failed(job, e)
+
+    @staticmethod
+    def complete_upload(job, url):
+        with transaction.atomic():
+            job = MediaJob.objects.select_for_update().get(pk=job.pk)
+            blob = CoverBlob.objects.select_for_update().filter(pk=job.blob_id).first()
+
+            if job.status == MediaJob.Status.CANCELLED or blob is None:
+                # Nobody references this cover any more: the file we just stored is an orphan
+                MediaJobService.enqueue_destroy(url)
+            else:
+                CoverService.complete_variant(blob, job.variant, url, job)
+
+            MediaJobService.mark_done(job)
+
+    @staticmethod
+    def mark_done(job):
+        if job.status != MediaJob.Status.CANCELLED:
+            job.status = MediaJob.Status.DONE
+        job.payload = None
+        job.last_error = ''
+        job.save(update_fields=['status', 'payload', 'last_error', 'updated_at'])
+
+    @staticmethod
+    def mark_failed(job, error):
+        job.last_error = str(error)
+        if job.attempts >= settings.MEDIA_JOB_MAX_ATTEMPTS:
+            job.status = MediaJob.Status.FAILED
+        else:
+            job.status = MediaJob.Status.PENDING
+            backoff = settings.MEDIA_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            job.available_at = timezone.now() + timedelta(seconds=backoff)
+
+        with transaction.atomic():
+            updated = MediaJob.objects.filter(pk=job.pk).exclude(status=MediaJob.Status.CANCELLED).update(
+                status=job.status, available_at=job.available_at, last_error=job.last_error, updated_at=timezone.now()
+            )
+            if updated and job.status == MediaJob.Status.FAILED and job.action == MediaJob.Action.UPLOAD:
+                blob = CoverBlob.objects.select_for_update().filter(pk=job.blob_id).first()
+                if blob is not None:
+                    CoverService.fail(blob)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_books_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(fields=['-created_at', '-id'], name='books_created_id_idx'),
+        ),
+    ]
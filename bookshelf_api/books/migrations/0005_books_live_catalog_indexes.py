@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_books_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='books',
+            name='books_books_publish_e61557_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='books',
+            name='books_books_is_avai_c9cd4d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='books',
+            name='books_created_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['created_at', 'id'], name='books_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['published_date', 'id'], name='books_live_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['genre', 'created_at', 'id'], name='books_live_genre_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['author', 'created_at', 'id'], name='books_live_author_created_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_covers_ready(apps, schema_editor):
+    Books = apps.get_model('books', 'Books')
+    Books.objects.exclude(cover_image__isnull=True).exclude(cover_image='').update(cover_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_books_live_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='books',
+            name='cover_status',
+            field=models.CharField(choices=[('none', 'None'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('upload', 'Upload'), ('destroy', 'Destroy')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=10)),
+                ('payload', models.BinaryField(blank=True, null=True)),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('target', models.CharField(blank=True, max_length=255)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('book', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_jobs', to='books.books')),
+            ],
+            options={
+                'verbose_name': 'Media Job',
+                'verbose_name_plural': 'Media Jobs',
+                'ordering': ['available_at'],
+                'indexes': [models.Index(condition=models.Q(('status__in', ['pending', 'running'])), fields=['available_at'], name='media_jobs_queue_idx')],
+            },
+        ),
+        migrations.RunPython(mark_existing_covers_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+def tag_queued_uploads(apps, schema_editor):
+    # Uploads queued before variants existed carry the original image for the main cover
+    MediaJob = apps.get_model('books', 'MediaJob')
+    MediaJob.objects.filter(action='upload', variant='').update(variant='full')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_media_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='books',
+            name='cover_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='mediajob',
+            name='variant',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.RunPython(tag_queued_uploads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def adopt_queued_uploads(apps, schema_editor):
+    # Uploads queued before blobs existed target a book; give each such book its own blob
+    Books = apps.get_model('books', 'Books')
+    CoverBlob = apps.get_model('books', 'CoverBlob')
+    MediaJob = apps.get_model('books', 'MediaJob')
+
+    queued = MediaJob.objects.filter(action='upload', status__in=['pending', 'running'], blob__isnull=True, book__isnull=False)
+    for book_id in queued.values_list('book_id', flat=True).distinct():
+        blob = CoverBlob.objects.create(content_hash=f'unhashed-book-{book_id}', ref_count=1)
+        queued.filter(book_id=book_id).update(blob=blob, book=None)
+        Books.objects.filter(pk=book_id).update(pending_cover_blob=blob)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_cover_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoverBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('variants', models.JSONField(blank=True, default=dict)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cover Blob',
+                'verbose_name_plural': 'Cover Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='books',
+            name='cover_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='books', to='books.coverblob'),
+        ),
+        migrations.AddField(
+            model_name='books',
+            name='pending_cover_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pending_books', to='books.coverblob'),
+        ),
+        migrations.AddField(
+            model_name='mediajob',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='media_jobs', to='books.coverblob'),
+        ),
+        migrations.RunPython(adopt_queued_uploads, migrations.RunPython.noop),
+    ]
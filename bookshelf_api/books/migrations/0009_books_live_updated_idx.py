@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_cover_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['updated_at', 'id'], name='books_live_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:44
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_deleted_at(apps, schema_editor):
+    # The last update of an already deleted book is the best estimate of its deletion time
+    Books = apps.get_model('books', 'Books')
+    Books.objects.filter(is_deleted=True, deleted_at__isnull=True).update(deleted_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_books_live_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('title', models.CharField(max_length=255)),
+                ('slug', models.SlugField(blank=True, db_index=False, max_length=255, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('pages', models.PositiveIntegerField()),
+                ('genre', models.CharField(max_length=100)),
+                ('published_date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Book',
+                'verbose_name_plural': 'Archived Books',
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='books',
+            name='books_search_vector_idx',
+        ),
+        migrations.AddField(
+            model_name='books',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='books',
+            name='slug',
+            field=models.SlugField(blank=True, db_index=False, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='books',
+            name='title',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['search_vector'], name='books_live_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='books_deleted_at_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='books',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('title',), name='books_live_title_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='books',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('slug',), name='books_live_slug_uniq'),
+        ),
+        migrations.AddField(
+            model_name='archivedbook',
+            name='author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_books', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_deleted_at, migrations.RunPython.noop),
+    ]
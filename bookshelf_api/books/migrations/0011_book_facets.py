@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:45
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear
+
+
+def build_facets(apps, schema_editor):
+    Books = apps.get_model('books', 'Books')
+    BookFacet = apps.get_model('books', 'BookFacet')
+    live = Books.objects.filter(is_available=True, is_deleted=False)
+
+    facets = [
+        BookFacet(dimension='genre', value=str(row['genre_id']), count=row['count'])
+        for row in live.values('genre_id').annotate(count=models.Count('id'))
+    ] + [
+        BookFacet(dimension='author', value=str(row['author_id']), count=row['count'])
+        for row in live.values('author_id').annotate(count=models.Count('id'))
+    ] + [
+        BookFacet(dimension='year', value=str(row['year']), count=row['count'])
+        for row in live.values(year=ExtractYear('published_date')).annotate(count=models.Count('id'))
+    ]
+    BookFacet.objects.bulk_create(facets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_live_books'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('genre', 'Genre'), ('year', 'Year'), ('author', 'Author')], max_length=10)),
+                ('value', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Book Facet',
+                'verbose_name_plural': 'Book Facets',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='book_facets_dimension_value_uniq')],
+            },
+        ),
+        migrations.RunPython(build_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_book_facets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False)), fields=['title', 'id'], name='books_live_title_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+# books.models.RESERVED_SLUGS when this migration was written
+RESERVED_SLUGS = ['search', 'facets', 'export', 'upload']
+
+
+def rename_reserved_slugs(apps, schema_editor):
+    # Books with these slugs could not be fetched from their detail URL; they get the
+    # slug that books.models.book_slug now gives their title
+    Books = apps.get_model('books', 'Books')
+    ReadingListItem = apps.get_model('reading_lists', 'ReadingListItem')
+    for book in Books.objects.filter(slug__in=RESERVED_SLUGS):
+        slug = f'{book.slug}-book'
+        if Books.objects.filter(slug=slug, is_deleted=False).exclude(pk=book.pk).exists():
+            slug = f'{slug}-{book.pk}'
+        Books.objects.filter(pk=book.pk).update(slug=slug)
+        ReadingListItem.objects.filter(book_id=book.pk).update(book_slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_books_live_title_index'),
+        ('reading_lists', '0009_database_cascades'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_reserved_slugs, migrations.RunPython.noop),
+    ]
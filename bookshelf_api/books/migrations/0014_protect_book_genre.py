@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_rename_reserved_slugs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='books',
+            name='genre',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='books', to='books.genre'),
+        ),
+    ]
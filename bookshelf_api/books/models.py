@@ -1,4 +1,7 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -16,34 +19,200 @@ class Genre(models.Model):
         return self.name
 
 
+class CoverBlob(models.Model):
+    # One stored cover per distinct upload, shared by every book that uses it
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    variants = models.JSONField(default=dict, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cover Blob'
+        verbose_name_plural = 'Cover Blobs'
+
+    def __str__(self):
+        return self.content_hash
+
+
+# First path segments under /api/books/ used by other endpoints: a book with one of these
+# slugs could never be fetched from its detail URL (books.urls)
+RESERVED_SLUGS = {'search', 'facets', 'export', 'upload'}
+
+
+def book_slug(title):
+    slug = slugify(title)
+    return f'{slug}-book' if slug in RESERVED_SLUGS else slug
+
+
+LIVE_BOOKS = models.Q(is_available=True, is_deleted=False)
+NOT_DELETED = models.Q(is_deleted=False)
+
+
+class BookManager(models.Manager):
+    # Default manager: soft-deleted books are invisible unless `Books.all_objects` is used
+    def get_queryset(self):
+        return super().get_queryset().filter(NOT_DELETED)
+
+
 class Books(models.Model):
-    title = models.CharField(max_length=255, unique=True)
+    class CoverStatus(models.TextChoices):
+        NONE = 'none', 'None'
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    title = models.CharField(max_length=255)
     cover_image = models.URLField(max_length=255, blank=True, null=True)
+    cover_status = models.CharField(max_length=10, choices=CoverStatus.choices, default=CoverStatus.NONE)
+    cover_variants = models.JSONField(default=dict, blank=True)
+    cover_blob = models.ForeignKey(CoverBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='books')
+    pending_cover_blob = models.ForeignKey(
+        CoverBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='pending_books'
+    )
     description = models.TextField(blank=True, null=True)
     pages = models.PositiveIntegerField()
     author = models.ForeignKey('users.Users', to_field='id', on_delete=models.CASCADE, related_name='books_written')
-    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='books')
+    # PROTECT: a cascade through Django's collector would skip the facet and cover
+    # bookkeeping of BookFacetService and CoverService; a genre is deleted once it is empty
+    genre = models.ForeignKey(Genre, on_delete=models.PROTECT, related_name='books')
     published_date = models.DateField()
     is_available = models.BooleanField(default=True)
-    slug = models.SlugField(max_length=255, unique=True, blank=True, null=True)
+    slug = models.SlugField(max_length=255, blank=True, null=True, db_index=False)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookManager()
+    all_objects = models.Manager()
+
     class Meta:
         verbose_name = 'Book'
         verbose_name_plural = 'Books'
         ordering = ['-created_at']
+        # Uniqueness (and the slug/title lookup indexes behind it) covers live books only;
+        # a deleted book's title can be reused and its row leaves the index
+        constraints = [
+            models.UniqueConstraint(fields=['title'], condition=NOT_DELETED, name='books_live_title_uniq'),
+            models.UniqueConstraint(fields=['slug'], condition=NOT_DELETED, name='books_live_slug_uniq'),
+        ]
         indexes = [
-            models.Index(fields=['published_date']),
-            models.Index(fields=['is_available']),
+            # Partial indexes over the live catalog, one per supported sort and filter.
+            # Each also serves the reverse order by scanning backwards.
+            models.Index(fields=['created_at', 'id'], condition=LIVE_BOOKS, name='books_live_created_idx'),
+            models.Index(fields=['published_date', 'id'], condition=LIVE_BOOKS, name='books_live_published_idx'),
+            models.Index(fields=['title', 'id'], condition=LIVE_BOOKS, name='books_live_title_idx'),
+            models.Index(fields=['genre', 'created_at', 'id'], condition=LIVE_BOOKS, name='books_live_genre_created_idx'),
+            models.Index(fields=['author', 'created_at', 'id'], condition=LIVE_BOOKS, name='books_live_author_created_idx'),
+            models.Index(fields=['updated_at', 'id'], condition=LIVE_BOOKS, name='books_live_updated_idx'),
+            GinIndex(fields=['search_vector'], condition=LIVE_BOOKS, name='books_live_search_vector_idx'),
+            # Archival scan (books.services.BookArchiveService)
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='books_deleted_at_idx'),
         ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title) or f"book-{self.pk}"
+            self.slug = book_slug(self.title) or f"book-{self.pk}"
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
+
+class BookFacet(models.Model):
+    # Live-catalog book counts per genre, publication year and author, kept up to date by
+    # BookFacetService and rebuilt by `manage.py rebuild_book_facets`
+    class Dimension(models.TextChoices):
+        GENRE = 'genre', 'Genre'
+        YEAR = 'year', 'Year'
+        AUTHOR = 'author', 'Author'
+
+    dimension = models.CharField(max_length=10, choices=Dimension.choices)
+    value = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Book Facet'
+        verbose_name_plural = 'Book Facets'
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='book_facets_dimension_value_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+
+
+class ArchivedBook(models.Model):
+    # Books soft-deleted longer than BOOK_ARCHIVE_RETENTION_DAYS, moved out of books_books
+    # by `manage.py archive_deleted_books`
+    original_id = models.BigIntegerField(unique=True)
+    title = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, blank=True, null=True, db_index=False)
+    description = models.TextField(blank=True, null=True)
+    pages = models.PositiveIntegerField()
+    author = models.ForeignKey('users.Users', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_books')
+    genre = models.CharField(max_length=100)
+    published_date = models.DateField()
+    created_at = models.DateTimeField()
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Archived Book'
+        verbose_name_plural = 'Archived Books'
+        ordering = ['-archived_at']
+
+    def __str__(self):
+        return self.title
+
+
+class MediaJob(models.Model):
+    # Outbox for cover storage work. Rows are written in the same transaction as the
+    # book change and drained by `manage.py process_media_jobs` after commit.
+    class Action(models.TextChoices):
+        UPLOAD = 'upload', 'Upload'
+        DESTROY = 'destroy', 'Destroy'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+        CANCELLED = 'cancelled', 'Cancelled'
+
+    book = models.ForeignKey(Books, on_delete=models.SET_NULL, null=True, blank=True, related_name='media_jobs')
+    blob = models.ForeignKey(CoverBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='media_jobs')
+    action = models.CharField(max_length=10, choices=Action.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    payload = models.BinaryField(blank=True, null=True)
+    variant = models.CharField(max_length=20, blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    target = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Media Job'
+        verbose_name_plural = 'Media Jobs'
+        ordering = ['available_at']
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='media_jobs_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.action} #{self.pk} ({self.status})"
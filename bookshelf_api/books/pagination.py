@@ -0,0 +1,111 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+# Keyset pagination: each page is a range scan on the ordering index instead of
+# COUNT(*) + OFFSET. Cursors are signed so clients cannot forge positions.
+# Views may provide get_ordering() returning (field, tiebreaker); both sort in
+# the same direction so one btree index serves either direction.
+class BookCursorPagination(BasePagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    cursor_salt = 'books.pagination.cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if hasattr(view, 'get_ordering'):
+            self.ordering = tuple(view.get_ordering())
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_position_fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def get_position_filter(self, position):
+        field, tiebreaker = self.get_position_fields()
+        value, pk = position
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        tiebreaker_lookup = 'lt' if self.ordering[1].startswith('-') else 'gt'
+        return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'{tiebreaker}__{tiebreaker_lookup}': pk})
+
+    def encode_cursor(self, instance):
+        field, tiebreaker = self.get_position_fields()
+        payload = {
+            'o': list(self.ordering),
+            'v': self.model._meta.get_field(field).value_to_string(instance),
+            'pk': getattr(instance, tiebreaker),
+        }
+        token = signing.dumps(payload, salt=self.cursor_salt, compress=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = signing.loads(token, salt=self.cursor_salt)
+            if payload['o'] != list(self.ordering):
+                raise ValueError("Cursor does not match the requested ordering")
+            field, _ = self.get_position_fields()
+            return self.model._meta.get_field(field).to_python(payload['v']), int(payload['pk'])
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
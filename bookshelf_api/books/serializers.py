@@ -1,19 +1,35 @@
 from rest_framework import serializers
-from PIL import Image, UnidentifiedImageError
 from datetime import date
 import logging
+from .images import InvalidCoverImage, process_cover_image
 from .models import Books
 
 
 logger = logging.getLogger(__name__)
 
+class CoverImageField(serializers.FileField):
+    # Validates and renders the cover variants in one pass; the validated value is a ProcessedCover
+    def to_internal_value(self, data):
+        upload = super().to_internal_value(data)
+        try:
+            return process_cover_image(upload)
+        except InvalidCoverImage as e:
+            raise serializers.ValidationError(str(e))
+
+
+class OptionalBooleanField(serializers.BooleanField):
+    # Multipart forms omit unchecked booleans; without this a missing key reads as False
+    default_empty_html = serializers.empty
+
+
 class BookSerializer(serializers.ModelSerializer):
     author = serializers.SerializerMethodField()
     genre = serializers.SerializerMethodField()
+    cover_thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Books
-        fields = ['id', 'title', 'author', 'genre', 'published_date', 'is_available', 'slug']
+        fields = ['id', 'title', 'author', 'genre', 'published_date', 'is_available', 'slug', 'cover_thumbnail']
 
     def get_author(self, obj):
         return obj.author.username
@@ -21,9 +37,19 @@ class BookSerializer(serializers.ModelSerializer):
     def get_genre(self, obj):
         return obj.genre.name
 
+    def get_cover_thumbnail(self, obj):
+        return obj.cover_variants.get('thumbnail')
+
+
+class BookDetailSerializer(BookSerializer):
+    class Meta(BookSerializer.Meta):
+        fields = BookSerializer.Meta.fields + [
+            'description', 'pages', 'cover_image', 'cover_variants', 'cover_status', 'created_at', 'updated_at'
+        ]
+
 
 class BookUploadSerializer(serializers.ModelSerializer):
-    cover_image = serializers.ImageField(required=False)
+    cover_image = CoverImageField(required=False)
     genre = serializers.CharField(max_length=100, required=True)
 
     class Meta:
@@ -56,48 +82,6 @@ class BookUploadSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Published date cannot be in the future")
         return value
 
-    def validate_cover_image(self, value):
-        max_size_bytes = 5 * 1024 * 1024
-        if getattr(value, "size", 0) > max_size_bytes:
-            raise serializers.ValidationError("Image file size must be less than 5MB")
-
-        original_pos = 0
-        if hasattr(value, "tell"):
-            try:
-                original_pos = value.tell()
-            except Exception:
-                pass
-
-        try:
-            try:
-                value.seek(0)
-            except Exception:
-                pass
-
-            img = Image.open(value)
-            img.verify()
-
-            try:
-                value.seek(0)
-            except Exception:
-                pass
-
-            img2 = Image.open(value)
-            PIL_ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP", "BMP", "TIFF"}
-            if img2.format not in PIL_ALLOWED_FORMATS:
-                raise serializers.ValidationError(f"Invalid image format: {img2.format}.")
-        except (UnidentifiedImageError, OSError) as e:
-            raise serializers.ValidationError(f"Invalid image file: {e}")
-        finally:
-            try:
-                value.seek(original_pos)
-            except Exception:
-                try:
-                    value.seek(0)
-                except Exception:
-                    pass
-        return value
-
     def validate_genre(self, value):
         value = value.strip()
         if not value:
@@ -113,8 +97,8 @@ class BookEditSerializer(serializers.Serializer):
     pages = serializers.IntegerField(min_value=1, required=False)
     genre = serializers.CharField(max_length=100, required=False)
     published_date = serializers.DateField(required=False)
-    is_available = serializers.BooleanField(required=False)
-    cover_image = serializers.ImageField(required=False)
+    is_available = OptionalBooleanField(required=False)
+    cover_image = CoverImageField(required=False)
 
     def validate_title(self, value):
         value = value.strip()
@@ -134,49 +118,6 @@ class BookEditSerializer(serializers.Serializer):
             raise serializers.ValidationError("Published date cannot be in the future")
         return value
 
-    def validate_cover_image(self, value):
-        if value:
-            max_size_bytes = 5 * 1024 * 1024
-            if getattr(value, "size", 0) > max_size_bytes:
-                raise serializers.ValidationError("Image file size must be less than 5MB")
-
-            original_pos = 0
-            if hasattr(value, "tell"):
-                try:
-                    original_pos = value.tell()
-                except Exception:
-                    pass
-
-            try:
-                try:
-                    value.seek(0)
-                except Exception:
-                    pass
-
-                img = Image.open(value)
-                img.verify()
-
-                try:
-                    value.seek(0)
-                except Exception:
-                    pass
-
-                img2 = Image.open(value)
-                PIL_ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP", "BMP", "TIFF"}
-                if img2.format not in PIL_ALLOWED_FORMATS:
-                    raise serializers.ValidationError(f"Invalid image format: {img2.format}.")
-            except (UnidentifiedImageError, OSError) as e:
-                raise serializers.ValidationError(f"Invalid image file: {e}")
-            finally:
-                try:
-                    value.seek(original_pos)
-                except Exception:
-                    try:
-                        value.seek(0)
-                    except Exception:
-                        pass
-        return value
-
     def validate(self, data):
         if not any(data.keys()):
             raise serializers.ValidationError("No fields provided for update")
@@ -197,3 +138,35 @@ class BookDeleteSerializer(serializers.Serializer):
             raise serializers.ValidationError("Slug cannot be empty")
         return value
 
+
+class BookSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=200)
+
+    def validate_q(self, value):
+        value = value.strip()
+        if len(value) < 2:
+            raise serializers.ValidationError("Search query must be at least 2 characters")
+        return value
+
+
+class BookListFilterSerializer(serializers.Serializer):
+    ORDERING_CHOICES = ['-created_at', 'created_at', '-published_date', 'published_date', 'title', '-title']
+
+    genre = serializers.CharField(max_length=100, required=False)
+    author = serializers.CharField(max_length=150, required=False)
+    published_after = serializers.DateField(required=False)
+    published_before = serializers.DateField(required=False)
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, required=False, default='-created_at')
+
+    def validate(self, data):
+        published_after = data.get('published_after')
+        published_before = data.get('published_before')
+        if published_after and published_before and published_after > published_before:
+            raise serializers.ValidationError("published_after cannot be later than published_before")
+        return data
+
+
+class BookExportSerializer(serializers.Serializer):
+    # Not `format`: DRF reserves that query parameter for renderer selection
+    export_format = serializers.ChoiceField(choices=['ndjson', 'csv'], required=False, default='ndjson')
+    updated_since = serializers.DateTimeField(required=False)
@@ -1,98 +1,144 @@
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
-from decouple import config
-from django.db import transaction
-from django.utils.text import slugify
-import cloudinary.uploader, logging
-from .models import Books, Genre
-from .models import Books
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import IntegrityError, connection, transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+from collections import Counter
+import logging
+from .caches import book_detail_cache, catalog_cache, genre_cache
+from .exports import EXPORT_CHUNK_SIZE
+from .media import CoverService
+from .models import LIVE_BOOKS, ArchivedBook, BookFacet, Books, Genre, book_slug
+from .serializers import BookDetailSerializer
+from .signals import books_deleting
 
 
 logger = logging.getLogger(__name__)
 
+SEARCH_CONFIG = 'english'
+BOOK_SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+    SearchVector('description', weight='B', config=SEARCH_CONFIG)
+)
+class GenreService:
+    @staticmethod
+    def resolve(name):
+        return GenreService.resolve_many([name])[name]
+
+    @staticmethod
+    def resolve_many(names, create=True):
+        # Returns {name: genre id}; no query when every name is cached. Missing
+        # genres are created unless create=False, in which case they are left out.
+        names = set(names)
+        resolved = genre_cache.get_many(names)
+        missing = names - resolved.keys()
+        if not missing:
+            return resolved
+
+        existing = dict(Genre.objects.filter(name__in=missing).values_list('name', 'id'))
+        genre_cache.set_many(existing)
+        resolved.update(existing)
+
+        new_names = missing - existing.keys()
+        if new_names and create:
+            Genre.objects.bulk_create([Genre(name=name) for name in new_names], ignore_conflicts=True)
+            created = dict(Genre.objects.filter(name__in=new_names).values_list('name', 'id'))
+            resolved.update(created)
+            # Only cached once committed, so a rolled back genre is never handed out
+            transaction.on_commit(lambda: genre_cache.set_many(created))
+        return resolved
+
+    @staticmethod
+    def write_with_genres(names, write):
+        # Runs write({name: genre id}) in a transaction. Cached ids can belong to a genre
+        # another process deleted, which fails the write on its foreign key (at commit);
+        # those entries are then dropped and the write is retried once with fresh ids.
+        names = set(names)
+        for attempt in range(2):
+            genres = {}
+            try:
+                with transaction.atomic():
+                    genres = GenreService.resolve_many(names)
+                    return write(genres)
+            except IntegrityError:
+                live = set(Genre.objects.filter(id__in=genres.values()).values_list('id', flat=True))
+                stale = [name for name, genre_id in genres.items() if genre_id not in live]
+                if attempt or not stale:
+                    raise
+                logger.warning(f"Cached genres no longer exist, retrying: {stale}")
+                for name in stale:
+                    genre_cache.delete(name)
+
+
 class BookService:
     @staticmethod
     def create_book(validated_data, user):
         try:
             cover_image = validated_data.pop('cover_image', None)
             genre_name = validated_data.pop('genre')
-            cover_image_url = None
-
-            with transaction.atomic():
-                genre, _ = Genre.objects.get_or_create(
-                    name=genre_name,
-                    defaults={'name': genre_name}
-                )
-
-                # Image upload to Cloudinary
-                if cover_image:
-                    try:
-                        upload_result = cloudinary.uploader.upload(
-                            cover_image,
-                            upload_preset=config('CLOUDINARY_UPLOAD_PRESET'),
-                            resource_type='image'
-                        )
-                        cover_image_url = upload_result['secure_url']
-                    except Exception as e:
-                        logger.error(f"Cloudinary upload failed: {e}")
-                        raise ValidationError({"error": "Failed to upload cover image"}, code=status.HTTP_400_BAD_REQUEST)
 
+            def write(genres):
                 book = Books.objects.create(
                     author=user,
                     title=validated_data['title'],
                     description=validated_data.get('description', ''),
                     pages=validated_data['pages'],
-                    genre=genre,
+                    genre_id=genres[genre_name],
                     published_date=validated_data['published_date'],
-                    cover_image=cover_image_url,
                 )
-                
+                BookService.update_search_vector(book)
+
+                # The cover is stored by the media worker once this transaction commits
+                if cover_image:
+                    CoverService.attach(book, cover_image)
+
+                BookFacetService.record_change([], BookFacetService.facet_values(book))
+                catalog_cache.invalidate_on_commit()
+                # The slug may have been cached as not found
+                book_detail_cache.invalidate(book.slug)
                 return book
+
+            return GenreService.write_with_genres([genre_name], write)
         except Exception as e:
             logger.error(f"Error creating book: {e}")
             raise ValidationError({"error": "Failed to create book due to an unexpected error"}, code=status.HTTP_400_BAD_REQUEST)
     
     @staticmethod
     def update_book(slug, validated_data, user):
-        with transaction.atomic():
+        def write(genres):
             try:
-                book = Books.objects.filter(is_deleted=False).get(slug=slug)
+                # Locked so a concurrent media worker cannot have its cover update overwritten
+                book = Books.objects.select_for_update().get(slug=slug)
+                old_slug = book.slug
+                old_facets = BookFacetService.facet_values(book)
 
-                if book.author.id != user.id:
+                if book.author_id != user.id:
                     raise ValidationError({"error": "You are not authorized to update this book"}, code=status.HTTP_403_FORBIDDEN)
 
                 update_fields = {}
                 for field, value in validated_data.items():
                     if field == 'genre':
-                        genre, _ = Books.objects.get_or_create(name=value, defaults={'name': value})
-                        update_fields['genre'] = genre
+                        update_fields['genre_id'] = genres[value]
                     elif field == 'cover_image':
+                        # The old image is released once the new one is stored by the media worker
                         if value:
-                            try:
-                                upload_result = cloudinary.uploader.upload(
-                                    value,
-                                    upload_preset=config('CLOUDINARY_UPLOAD_PRESET'),
-                                    resource_type='image'
-                                )
-                                new_cover_image_url = upload_result['secure_url']
-                                # Delete old image if it exists
-                                if book.cover_image:
-                                    cloudinary.uploader.destroy(
-                                        cloudinary.CloudinaryImage(book.cover_image).public_id,
-                                        invalidate=True
-                                    )
-                                update_fields['cover_image'] = new_cover_image_url
-                            except Exception as e:
-                                logger.error(f"Cloudinary upload failed: {e}")
-                                raise ValidationError({"error": "Failed to upload cover image"}, code=status.HTTP_400_BAD_REQUEST)
+                            CoverService.attach(book, value)
                     else:
                         update_fields[field] = value
 
                 for field, value in update_fields.items():
                     setattr(book, field, value)
                     if field == 'title':
-                        book.slug = slugify(value)
+                        book.slug = book_slug(value)
                 book.save()
+                if update_fields.keys() & {'title', 'description'}:
+                    BookService.update_search_vector(book)
+                BookFacetService.record_change(old_facets, BookFacetService.facet_values(book))
+                catalog_cache.invalidate_on_commit()
+                book_detail_cache.invalidate(old_slug, book.slug)
                 return book
             except Books.DoesNotExist:
                 logger.warning(f"Book not found or already deleted with slug: {slug}")
@@ -104,18 +150,25 @@ class BookService:
                 logger.error(f"Error updating book with slug {slug}: {str(e)}")
                 raise ValidationError({"error": "An unexpected error occurred"}, code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        return GenreService.write_with_genres([validated_data['genre']] if 'genre' in validated_data else [], write)
+
     @staticmethod
     def delete_book(slug, user):
         with transaction.atomic():
             try:
-                book = Books.objects.filter(is_deleted=False).get(slug=slug)
+                book = Books.objects.get(slug=slug)
 
-                if book.author.id != user.id:
+                if book.author_id != user.id:
                     logger.warning(f"Unauthorized delete attempt on book {book.title} by user {user.username}")
                     raise ValidationError({"error": "You are not authorized to delete this book"}, code=status.HTTP_403_FORBIDDEN)
 
+                old_facets = BookFacetService.facet_values(book)
                 book.is_deleted = True
+                book.deleted_at = timezone.now()
                 book.save()
+                BookFacetService.record_change(old_facets, [])
+                catalog_cache.invalidate_on_commit()
+                book_detail_cache.invalidate(book.slug)
                 return book
             except Books.DoesNotExist:
                 logger.warning(f"Book not found or already deleted with slug: {slug}")
@@ -127,3 +180,212 @@ class BookService:
                 logger.error(f"Error deleting book with slug {slug}: {str(e)}")
                 raise ValidationError({"error": "An unexpected error occurred"}, code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def get_book_detail(slug):
+        book = Books.objects.filter(is_available=True, slug=slug).select_related('author', 'genre').defer(
+            'search_vector'
+        ).first()
+        return BookDetailSerializer(book).data if book else None
+
+    @staticmethod
+    def update_search_vector(book):
+        # The stored vector only exists on PostgreSQL; other backends search with LIKE
+        if connection.vendor != 'postgresql':
+            return
+        Books.objects.filter(pk=book.pk).update(search_vector=BOOK_SEARCH_VECTOR)
+
+    @staticmethod
+    def search_books(query):
+        books = Books.objects.filter(is_available=True).select_related('author', 'genre')
+
+        if connection.vendor == 'postgresql':
+            search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+            return books.filter(search_vector=search_query).annotate(
+                rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-rank', '-created_at', 'id')
+
+        terms = query.split()
+        for term in terms:
+            books = books.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return books.annotate(
+            rank=Case(When(title__icontains=query, then=Value(1)), default=Value(0), output_field=IntegerField())
+        ).order_by('-rank', '-created_at', 'id')
+
+    @staticmethod
+    def export_books(updated_since=None):
+        # Plain tuples read through a server-side cursor on PostgreSQL, so memory stays
+        # flat for any catalog size. Ordered by id to keep the scan stable.
+        books = Books.objects.filter(LIVE_BOOKS)
+        if updated_since:
+            books = books.filter(updated_at__gte=updated_since)
+        return books.order_by('id').values_list(
+            'id', 'title', 'slug', 'author__username', 'genre__name', 'description', 'pages',
+            'published_date', 'is_available', 'cover_image', 'created_at', 'updated_at'
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class BookArchiveService:
+    @staticmethod
+    def archive_batch(cutoff, chunk_size):
+        # Moves one chunk of books deleted before `cutoff` into the archive table. Each
+        # chunk is its own short transaction and only locks the dead rows it moves.
+        with transaction.atomic():
+            books = list(
+                Books.all_objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                    is_deleted=True, deleted_at__lt=cutoff
+                ).select_related('genre').order_by('deleted_at')[:chunk_size]
+            )
+            if not books:
+                return 0
+
+            ArchivedBook.objects.bulk_create([
+                ArchivedBook(
+                    original_id=book.id,
+                    title=book.title,
+                    slug=book.slug,
+                    description=book.description,
+                    pages=book.pages,
+                    author_id=book.author_id,
+                    genre=book.genre.name,
+                    published_date=book.published_date,
+                    created_at=book.created_at,
+                    deleted_at=book.deleted_at,
+                )
+                for book in books
+            ], ignore_conflicts=True)
+            for book in books:
+                CoverService.detach(book)
+            book_ids = [book.pk for book in books]
+            books_deleting.send(sender=Books, book_ids=book_ids)
+            Books.all_objects.filter(pk__in=book_ids).delete()
+        return len(books)
+
+
+class BookPurgeService:
+    @staticmethod
+    def purge_author_batch(author_id, chunk_size):
+        # Removes one chunk of an author's books for good (live, unavailable or deleted),
+        # with the same bookkeeping as a delete. Callers remove reading list items first.
+        with transaction.atomic():
+            books = list(
+                Books.all_objects.select_for_update(of=('self',)).filter(author_id=author_id).order_by('id')[:chunk_size]
+            )
+            if not books:
+                return 0
+
+            BookFacetService.record_change([value for book in books for value in BookFacetService.facet_values(book)], [])
+            for book in books:
+                CoverService.detach(book)
+            book_ids = [book.pk for book in books]
+            books_deleting.send(sender=Books, book_ids=book_ids)
+            Books.all_objects.filter(pk__in=book_ids).delete()
+            catalog_cache.invalidate_on_commit()
+            book_detail_cache.invalidate(*(book.slug for book in books))
+        return len(books)
+
+
+class BookFacetService:
+    # Facet counts cover the live catalog (available, not deleted). Writers pass the
+    # facet values a book had before and after their change, inside their transaction.
+    @staticmethod
+    def facet_values(book):
+        if not book.is_available or book.is_deleted:
+            return []
+        return [
+            (BookFacet.Dimension.GENRE, str(book.genre_id)),
+            (BookFacet.Dimension.YEAR, str(book.published_date.year)),
+            (BookFacet.Dimension.AUTHOR, str(book.author_id)),
+        ]
+
+    @staticmethod
+    def record_change(before, after):
+        deltas = Counter(after)
+        deltas.subtract(Counter(before))
+        BookFacetService.apply({key: delta for key, delta in deltas.items() if delta})
+
+    @staticmethod
+    def apply(deltas):
+        # At most two statements whatever the number of facets: create missing rows, then
+        # one UPDATE adding each delta in place (no read-modify-write)
+        if not deltas:
+            return
+        new_rows = [BookFacet(dimension=dimension, value=value) for (dimension, value), delta in deltas.items() if delta > 0]
+        if new_rows:
+            BookFacet.objects.bulk_create(new_rows, ignore_conflicts=True)
+        matches = Q()
+        whens = []
+        for (dimension, value), delta in deltas.items():
+            matches |= Q(dimension=dimension, value=value)
+            whens.append(When(dimension=dimension, value=value, then=Value(delta)))
+        BookFacet.objects.filter(matches).update(count=F('count') + Case(*whens, output_field=IntegerField()))
+
+    @staticmethod
+    def compute():
+        live = Books.objects.filter(LIVE_BOOKS).order_by()
+        counts = {}
+        for dimension, group_by in [
+            (BookFacet.Dimension.GENRE, {'value': F('genre_id')}),
+            (BookFacet.Dimension.AUTHOR, {'value': F('author_id')}),
+            (BookFacet.Dimension.YEAR, {'value': ExtractYear('published_date')}),
+        ]:
+            rows = live.values(**group_by).annotate(count=Count('id'))
+            counts.update({(dimension, str(row['value'])): row['count'] for row in rows})
+        return counts
+
+    @staticmethod
+    def drift():
+        # [(dimension, value, stored count, actual count)] for every facet that is off
+        stored = {(facet.dimension, facet.value): facet.count for facet in BookFacet.objects.all()}
+        actual = BookFacetService.compute()
+        return sorted(
+            (dimension, value, stored.get((dimension, value), 0), actual.get((dimension, value), 0))
+            for dimension, value in stored.keys() | actual.keys()
+            if stored.get((dimension, value), 0) != actual.get((dimension, value), 0)
+        )
+
+    @staticmethod
+    def rebuild():
+        with transaction.atomic():
+            # Taken before counting: writers that already applied a delta are waited for and
+            # counted, later ones wait in apply() until the new rows commit and then add their
+            # delta. A row lock would miss writers inserting a (dimension, value) row meanwhile.
+            # PostgreSQL only; SQLite serializes writers on its own.
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LOCK TABLE {connection.ops.quote_name(BookFacet._meta.db_table)} IN SHARE ROW EXCLUSIVE MODE")
+            drift = BookFacetService.drift()
+            BookFacet.objects.all().delete()
+            BookFacet.objects.bulk_create([
+                BookFacet(dimension=dimension, value=value, count=count)
+                for (dimension, value), count in BookFacetService.compute().items()
+            ])
+        return drift
+
+    @staticmethod
+    def get_facets():
+        facets = {dimension: [] for dimension in BookFacet.Dimension.values}
+        for facet in BookFacet.objects.filter(count__gt=0):
+            facets[facet.dimension].append(facet)
+
+        genre_names = dict(Genre.objects.filter(
+            id__in=[int(facet.value) for facet in facets[BookFacet.Dimension.GENRE]]
+        ).values_list('id', 'name'))
+        usernames = dict(get_user_model().objects.filter(
+            id__in=[int(facet.value) for facet in facets[BookFacet.Dimension.AUTHOR]]
+        ).values_list('id', 'username'))
+
+        return {
+            'genres': sorted(
+                ({'name': genre_names.get(int(facet.value)), 'count': facet.count} for facet in facets[BookFacet.Dimension.GENRE]),
+                key=lambda item: (-item['count'], item['name'] or '')
+            ),
+            'years': sorted(
+                ({'year': int(facet.value), 'count': facet.count} for facet in facets[BookFacet.Dimension.YEAR]),
+                key=lambda item: -item['year']
+            ),
+            'authors': sorted(
+                ({'username': usernames.get(int(facet.value)), 'count': facet.count} for facet in facets[BookFacet.Dimension.AUTHOR]),
+                key=lambda item: (-item['count'], item['username'] or '')
+            ),
+        }
+
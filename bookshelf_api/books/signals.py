@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from .models import Genre
+from .caches import book_detail_cache, catalog_cache, genre_cache
+
+
+# Sent with `book_ids` after Books rows are changed by QuerySet.update(), which sends
+# no post_save
+books_updated = Signal()
+
+# Sent with `book_ids` inside the deleting transaction, just before Books rows are
+# removed with QuerySet.delete(), which leaves DO_NOTHING foreign keys to the database
+books_deleting = Signal()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, **kwargs):
+    # A rename leaves the old name cached, so drop everything; the table is tiny
+    genre_cache.clear()
+    catalog_cache.invalidate_on_commit()
+    book_detail_cache.invalidate_all()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def author_saved(sender, instance, created, update_fields, **kwargs):
+    # Catalog pages and book details show the author's username; the last_login
+    # update on every login leaves them alone
+    if not created and (update_fields is None or 'username' in update_fields):
+        catalog_cache.invalidate_on_commit()
+        book_detail_cache.invalidate_all()
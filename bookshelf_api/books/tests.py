@@ -1,3 +1,394 @@
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import ProtectedError
+from django.test import override_settings
+from datetime import date
+from PIL import Image
+from unittest import mock
+import io, shutil, tempfile, time
+from bookshelf_api.testing import APIBudgetTestCase
+from .caches import book_detail_cache, genre_cache
+from .importer import BookImporter
+from .caches import book_detail_cache
+from .media import MediaJobService
+from .models import BookFacet, Books, CoverBlob, Genre
+from .services import BookFacetService, BookService
+from .views import (
+    BookListView, BookSearchView, BookExportView, BookFacetsView, BookDetailView, BookUploadView, BookEditView,
+    BookDeleteView
+)
 
-# Create your tests here.
+
+def make_cover(color='red', name='cover.png'):
+    content = io.BytesIO()
+    Image.new('RGB', (300, 400), color).save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+class BookTestCase(APIBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            COVER_STORAGE_BACKEND='books.media.LocalCoverStorage', MEDIA_ROOT=self.media_root
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = self.create_user()
+        self.authenticate(self.user)
+
+    def create_book(self, title, user=None, genre='Fiction', published_date=date(2020, 1, 1), **fields):
+        return BookService.create_book(
+            {'title': title, 'pages': 100, 'genre': genre, 'published_date': published_date, **fields},
+            user or self.user
+        )
+
+
+class BookEndpointBudgetTests(BookTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            self.create_book(f'Book {i}', genre=f'Genre {i % 3}', description='A story about ships')
+
+    def test_list(self):
+        with self.assertWithinBudget(BookListView):
+            response = self.client.get('/api/books/', {'genre': 'Genre 1'})
+        self.assertEqual(response.status_code, 200)
+        with self.assertWithinBudget(BookListView):
+            response = self.client.get(response.data['next'] or '/api/books/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_legacy_page_numbers(self):
+        with self.assertWithinBudget(BookListView):
+            response = self.client.get('/api/books/', {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+
+    def test_search(self):
+        with self.assertWithinBudget(BookSearchView):
+            response = self.client.get('/api/books/search/', {'q': 'ships'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+
+    def test_export(self):
+        with self.assertWithinBudget(BookExportView):
+            response = self.client.get('/api/books/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 12)
+
+    def test_facets(self):
+        with self.assertWithinBudget(BookFacetsView):
+            response = self.client.get('/api/books/facets/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail(self):
+        with self.assertWithinBudget(BookDetailView):
+            response = self.client.get('/api/books/book-3/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertWithinBudget(BookDetailView):
+            response = self.client.get('/api/books/missing/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_upload(self):
+        data = {
+            'title': 'Dune', 'pages': 412, 'genre': 'Science Fiction', 'published_date': '1965-08-01',
+            'cover_image': make_cover(),
+        }
+        with self.assertWithinBudget(BookUploadView):
+            response = self.client.post('/api/books/upload/', data, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+    def test_edit(self):
+        self.client.patch('/api/books/edit/book-1/', {'cover_image': make_cover('blue')}, format='multipart')
+        MediaJobService.process_pending()
+        data = {'title': 'Book One', 'genre': 'Genre 9', 'is_available': 'false', 'cover_image': make_cover('green')}
+        with self.assertWithinBudget(BookEditView):
+            response = self.client.patch('/api/books/edit/book-1/', data, format='multipart')
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        with self.assertWithinBudget(BookDeleteView):
+            response = self.client.delete('/api/books/delete/book-1/')
+        self.assertEqual(response.status_code, 200)
+
+
+class BookCursorPaginationTests(BookTestCase):
+    def collect(self, params):
+        titles = []
+        response = self.client.get('/api/books/', params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            titles += [book['title'] for book in response.data['results']]
+            if not response.data['next']:
+                return titles
+            response = self.client.get(response.data['next'])
+
+    def test_pages_cover_the_catalog_once(self):
+        for i in range(25):
+            self.create_book(f'Book {i:02}')
+        titles = self.collect({'page_size': 7})
+        self.assertEqual(titles, [f'Book {i:02}' for i in reversed(range(25))])
+
+    def test_ties_are_broken_by_id(self):
+        # Every book has the same publication date, so only the tiebreaker orders them
+        for i in range(9):
+            self.create_book(f'Book {i}')
+        self.assertEqual(self.collect({'ordering': 'published_date', 'page_size': 2}), [f'Book {i}' for i in range(9)])
+        self.assertEqual(
+            self.collect({'ordering': '-published_date', 'page_size': 2}), [f'Book {i}' for i in reversed(range(9))]
+        )
+
+    def test_title_ordering(self):
+        for title in ['Emma', 'Dune', 'Solaris', 'Beloved', 'Ulysses']:
+            self.create_book(title)
+        self.assertEqual(self.collect({'ordering': 'title', 'page_size': 2}), ['Beloved', 'Dune', 'Emma', 'Solaris', 'Ulysses'])
+        self.assertEqual(self.collect({'ordering': '-title', 'page_size': 3}), ['Ulysses', 'Solaris', 'Emma', 'Dune', 'Beloved'])
+
+    def test_cursor_is_bound_to_its_ordering(self):
+        for i in range(3):
+            self.create_book(f'Book {i}')
+        next_link = self.client.get('/api/books/', {'page_size': 1}).data['next']
+        cursor = next_link.split('cursor=')[1].split('&')[0]
+        self.assertEqual(self.client.get('/api/books/', {'cursor': cursor, 'ordering': 'title'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/books/', {'cursor': cursor[:-2]}).status_code, 404)
+
+
+class BookCacheTests(BookTestCase):
+    def test_catalog_pages_are_invalidated_by_writes(self):
+        self.create_book('Dune')
+        first = self.client.get('/api/books/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/books/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.client.patch('/api/books/edit/dune/', {'title': 'Dune Messiah'}, format='multipart')
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'Dune Messiah')
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'internal.example.com'])
+    def test_cached_links_use_the_requesting_host(self):
+        for i in range(3):
+            self.create_book(f'Book {i}')
+        first = self.client.get('/api/books/', {'page': 1, 'page_size': 2}, HTTP_HOST='api.example.com')
+        self.assertTrue(first.data['next'].startswith('http://api.example.com/api/books/?'))
+        second = self.client.get('/api/books/', {'page': 1, 'page_size': 2}, HTTP_HOST='internal.example.com')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertTrue(second.data['next'].startswith('http://internal.example.com/api/books/?'))
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        # A change in the same second leaves Last-Modified as it was
+        self.create_book('Dune')
+        first = self.client.get('/api/books/')
+        self.client.delete('/api/books/delete/dune/')
+        response = self.client.get('/api/books/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_versions_outlive_cached_entries(self):
+        # Entries expire, the versions they are keyed by only change with writes
+        self.create_book('Dune')
+        etag = self.client.get('/api/books/')['ETag']
+        detail_version = book_detail_cache.get_version('dune')
+        later = time.time() + 24 * 3600
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(book_detail_cache.get_version('dune'), detail_version)
+
+    def test_detail_follows_renames_and_deletes(self):
+        # A miss for the new slug is cached before the book exists
+        self.assertEqual(self.client.get('/api/books/dune/').status_code, 404)
+        self.create_book('Dune')
+        self.assertEqual(self.client.get('/api/books/dune/').data['title'], 'Dune')
+
+        self.client.patch('/api/books/edit/dune/', {'title': 'Dune Messiah'}, format='multipart')
+        self.assertEqual(self.client.get('/api/books/dune/').status_code, 404)
+        self.assertEqual(self.client.get('/api/books/dune-messiah/').data['title'], 'Dune Messiah')
+
+        self.client.delete('/api/books/delete/dune-messiah/')
+        self.assertEqual(self.client.get('/api/books/dune-messiah/').status_code, 404)
+
+
+    def test_detail_loaded_before_a_write_does_not_outlive_it(self):
+        self.create_book('Dune')
+        stale = BookService.get_book_detail('dune')
+
+        def slow_loader():
+            # The write commits while this request is still loading
+            self.client.patch('/api/books/edit/dune/', {'pages': 500}, format='multipart')
+            return stale
+
+        self.assertEqual(book_detail_cache.get_or_load('dune', slow_loader)['pages'], 100)
+        self.assertEqual(self.client.get('/api/books/dune/').data['pages'], 500)
+
+    def test_genre_and_author_renames_reach_details(self):
+        self.create_book('Dune', genre='Science Fiction')
+        self.assertEqual(self.client.get('/api/books/dune/').data['genre'], 'Science Fiction')
+        self.client.get('/api/books/')
+
+        genre = Genre.objects.get(name='Science Fiction')
+        genre.name = 'SF'
+        genre.save()
+        self.assertEqual(self.client.get('/api/books/dune/').data['genre'], 'SF')
+
+        self.client.patch('/api/profile/', {'username': 'frank'}, format='json')
+        self.assertEqual(self.client.get('/api/books/dune/').data['author'], 'frank')
+        self.assertEqual(self.client.get('/api/books/').data['results'][0]['author'], 'frank')
+
+    def test_reserved_slugs(self):
+        for title in ['Search', 'Export!', 'Upload']:
+            self.create_book(title)
+        self.assertEqual(self.client.get('/api/books/search-book/').data['title'], 'Search')
+        self.client.patch('/api/books/edit/upload-book/', {'title': 'Facets'}, format='multipart')
+        self.assertEqual(self.client.get('/api/books/facets-book/').data['title'], 'Facets')
+        self.assertEqual(
+            sorted(Books.objects.values_list('slug', flat=True)), ['export-book', 'facets-book', 'search-book']
+        )
+
+
+class BookFacetTests(BookTestCase):
+    def facet_count(self, dimension, value):
+        facet = BookFacet.objects.filter(dimension=dimension, value=str(value)).first()
+        return facet.count if facet else 0
+
+    def test_counts_follow_writes(self):
+        other = self.create_user('bob')
+        dune = self.create_book('Dune', genre='Science Fiction', published_date=date(1965, 8, 1))
+        self.create_book('Emma', genre='Classics', published_date=date(1815, 12, 23))
+        self.create_book('Solaris', user=other, genre='Science Fiction', published_date=date(1961, 6, 1))
+
+        response = self.client.get('/api/books/facets/')
+        self.assertIn({'name': 'Science Fiction', 'count': 2}, response.data['genres'])
+
+        self.client.patch('/api/books/edit/dune/', {'genre': 'Classics', 'published_date': '1961-01-01'}, format='multipart')
+        self.client.delete('/api/books/delete/emma/')
+
+        self.assertEqual(self.facet_count(BookFacet.Dimension.GENRE, dune.genre_id), 1)
+        self.assertEqual(self.facet_count(BookFacet.Dimension.YEAR, 1961), 2)
+        self.assertEqual(self.facet_count(BookFacet.Dimension.YEAR, 1965), 0)
+        self.assertEqual(self.facet_count(BookFacet.Dimension.AUTHOR, self.user.id), 1)
+        self.assertEqual(BookFacetService.drift(), [])
+
+    def test_unavailable_books_are_not_counted(self):
+        self.create_book('Dune')
+        self.client.patch('/api/books/edit/dune/', {'is_available': 'false'}, format='multipart')
+        self.assertEqual(BookFacetService.drift(), [])
+        self.assertEqual(self.facet_count(BookFacet.Dimension.AUTHOR, self.user.id), 0)
+
+    def test_genres_with_books_cannot_be_deleted(self):
+        # Deleting them would remove the books without the facet and cover bookkeeping
+        book = self.create_book('Dune', genre='Science Fiction')
+        with self.assertRaises(ProtectedError):
+            Genre.objects.get(name='Science Fiction').delete()
+        self.assertTrue(Books.objects.filter(pk=book.pk).exists())
+        self.assertEqual(BookFacetService.drift(), [])
+
+    def test_rebuild_repairs_drift(self):
+        self.create_book('Dune')
+        BookFacet.objects.update(count=7)
+        self.assertEqual(len(BookFacetService.rebuild()), 3)
+        self.assertEqual(BookFacetService.drift(), [])
+
+
+class CoverBlobTests(BookTestCase):
+    def upload(self, title, cover):
+        data = {'title': title, 'pages': 10, 'genre': 'Fiction', 'published_date': '2020-01-01', 'cover_image': cover}
+        response = self.client.post('/api/books/upload/', data, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Books.objects.get(title=title)
+
+    def test_identical_covers_share_one_blob(self):
+        dune = self.upload('Dune', make_cover('red'))
+        emma = self.upload('Emma', make_cover('red'))
+        blob = CoverBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual({dune.pending_cover_blob_id, emma.pending_cover_blob_id}, {blob.pk})
+
+        MediaJobService.process_pending()
+        dune.refresh_from_db()
+        blob.refresh_from_db()
+        self.assertEqual(blob.status, CoverBlob.Status.READY)
+        self.assertEqual(dune.cover_blob_id, blob.pk)
+        self.assertEqual(dune.cover_status, Books.CoverStatus.READY)
+
+        # Already stored: a third book shows it straight away
+        solaris = self.upload('Solaris', make_cover('red'))
+        self.assertEqual(solaris.cover_status, Books.CoverStatus.READY)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 3)
+
+    def test_replaced_cover_releases_its_blob(self):
+        self.upload('Dune', make_cover('red'))
+        self.upload('Emma', make_cover('red'))
+        MediaJobService.process_pending()
+
+        self.client.patch('/api/books/edit/dune/', {'cover_image': make_cover('blue')}, format='multipart')
+        MediaJobService.process_pending()
+        red, blue = CoverBlob.objects.order_by('id')
+        self.assertEqual((red.ref_count, blue.ref_count), (1, 1))
+
+        self.client.patch('/api/books/edit/emma/', {'cover_image': make_cover('blue')}, format='multipart')
+        self.assertFalse(CoverBlob.objects.filter(pk=red.pk).exists())
+        blue.refresh_from_db()
+        self.assertEqual(blue.ref_count, 2)
+
+
+class ListRejects:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row, error):
+        self.rows.append((row['title'], error))
+
+    def flush(self):
+        pass
+
+
+class BookImporterTests(BookTestCase):
+    def rows(self, titles):
+        return enumerate((
+            {'title': title, 'genre': 'Fiction', 'pages': '10', 'published_date': '2020-01-01', 'author': 'alice'}
+            for title in titles
+        ), start=1)
+
+    def test_duplicates_across_batches(self):
+        titles = ['Dune', 'Emma', 'Solaris', 'Dune', 'Beloved', 'EMMA!']
+        for dry_run in (True, False):
+            importer, rejects = BookImporter(batch_size=2, dry_run=dry_run), ListRejects()
+            importer.run(self.rows(titles), rejects)
+            self.assertEqual((importer.imported, importer.rejected), (4, 2))
+            self.assertEqual(rejects.rows, [('Dune', 'Duplicate title in import file'), ('EMMA!', 'Duplicate title in import file')])
+        self.assertEqual(Books.objects.count(), 4)
+
+
+class GenreCacheTests(BookTestCase):
+    def forget_genre_elsewhere(self, name):
+        # Another process deleted the genre: this process still has its id cached
+        genre_id = Genre.objects.get(name=name).id
+        Books.all_objects.filter(genre_id=genre_id).delete()
+        Genre.objects.filter(name=name).update(name=f'{name} (old)')
+        Genre.objects.filter(id=genre_id).delete()
+        genre_cache.set(name, genre_id)
+
+    def test_writes_retry_with_a_stale_genre_id(self):
+        self.create_book('Dune', genre='Science Fiction')
+        self.forget_genre_elsewhere('Science Fiction')
+
+        book = self.create_book('Solaris', genre='Science Fiction')
+        self.assertEqual(Books.objects.get(pk=book.pk).genre.name, 'Science Fiction')
+
+        self.forget_genre_elsewhere('Science Fiction')
+        self.create_book('Emma', genre='Classics')
+        response = self.client.patch('/api/books/edit/emma/', {'genre': 'Science Fiction'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Books.objects.get(title='Emma').genre.name, 'Science Fiction')
+
+        self.forget_genre_elsewhere('Science Fiction')
+        importer = BookImporter()
+        importer.run(enumerate([{
+            'title': 'Ubik', 'genre': 'Science Fiction', 'pages': '10', 'published_date': '1969-01-01', 'author': 'alice'
+        }], start=1), ListRejects())
+        self.assertEqual(importer.imported, 1)
+        self.assertEqual(Books.objects.get(title='Ubik').genre.name, 'Science Fiction')
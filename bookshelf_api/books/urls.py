@@ -1,11 +1,17 @@
 from django.urls import path
-from .views import BookListView, BookUploadView, BookDeleteView, BookEditView
+from .views import BookListView, BookSearchView, BookUploadView, BookDeleteView, BookEditView, BookExportView, BookDetailView, BookFacetsView
 
 
 urlpatterns = [
     path('', BookListView.as_view(), name='book-list'),
+    path('search/', BookSearchView.as_view(), name='book-search'),
+    path('facets/', BookFacetsView.as_view(), name='book-facets'),
+    path('export/', BookExportView.as_view(), name='book-export'),
     path('upload/', BookUploadView.as_view(), name='book-upload'),
     path('edit/<slug:slug>/', BookEditView.as_view(), name='book-edit'),
     path('delete/<slug:slug>/', BookDeleteView.as_view(), name='book-delete'),
+    # Keep last: it would shadow the fixed paths above, whose names are never used as
+    # slugs (books.models.RESERVED_SLUGS)
+    path('<slug:slug>/', BookDetailView.as_view(), name='book-detail'),
 ]
 
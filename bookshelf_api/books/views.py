@@ -5,30 +5,158 @@ from rest_framework.decorators import permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
+from django.http import StreamingHttpResponse
+from urllib.parse import urlsplit, urlunsplit
 import logging
+from bookshelf_api.conditional import make_etag, not_modified, set_validators
+from .caches import book_detail_cache, catalog_cache
+from .exports import stream_csv, stream_ndjson
 from .models import Books
-from .services import BookService
-from .serializers import BookSerializer, BookUploadSerializer, BookEditSerializer, BookDeleteSerializer
+from .pagination import StandardResultsSetPagination, BookCursorPagination
+from .services import BookFacetService, BookService
+from .serializers import (
+    BookSerializer, BookUploadSerializer, BookEditSerializer, BookDeleteSerializer, BookSearchSerializer,
+    BookListFilterSerializer, BookExportSerializer
+)
 
 
 logger = logging.getLogger(__name__)
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+@permission_classes([IsAuthenticated])
+class BookListView(generics.ListAPIView):
+    queryset = Books.objects.filter(is_available=True).select_related(
+        'author', 'genre'
+    ).defer('search_vector')
+    serializer_class = BookSerializer
+    pagination_class = BookCursorPagination
+    query_budget = 3
+
+    @property
+    def filters(self):
+        if not hasattr(self, '_filters'):
+            serializer = BookListFilterSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._filters = serializer.validated_data
+        return self._filters
+
+    def get_ordering(self):
+        ordering = self.filters['ordering']
+        direction = '-' if ordering.startswith('-') else ''
+        return ordering, f'{direction}id'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        filters = self.filters
+        if 'genre' in filters:
+            queryset = queryset.filter(genre__name=filters['genre'])
+        if 'author' in filters:
+            queryset = queryset.filter(author__username=filters['author'])
+        if 'published_after' in filters:
+            queryset = queryset.filter(published_date__gte=filters['published_after'])
+        if 'published_before' in filters:
+            queryset = queryset.filter(published_date__lte=filters['published_before'])
+        return queryset.order_by(*self.get_ordering())
+
+    def list(self, request, *args, **kwargs):
+        # Pages are the same for every user, so they are cached per catalog version and
+        # the version doubles as the validator: a 304 or a cache hit needs no query.
+        version = catalog_cache.get_version()
+        last_modified = catalog_cache.version_datetime(version)
+        etag = make_etag('books', version, request.get_full_path())
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        key = catalog_cache.make_key(version, request.get_full_path())
+        data, hit = catalog_cache.get_or_set(
+            key, lambda: self.relative_links(super(BookListView, self).list(request, *args, **kwargs).data)
+        )
+        response = set_validators(Response(self.absolute_links(data)), etag, last_modified)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    # Pagination links are cached without scheme and host, which may differ between the
+    # requests sharing a cache entry, and made absolute again for each response
+    LINK_FIELDS = ('next', 'previous')
+
+    def relative_links(self, data):
+        return {
+            name: urlunsplit(('', '', *urlsplit(value)[2:])) if name in self.LINK_FIELDS and value else value
+            for name, value in data.items()
+        }
+
+    def absolute_links(self, data):
+        return {
+            name: self.request.build_absolute_uri(value) if name in self.LINK_FIELDS and value else value
+            for name, value in data.items()
+        }
+
+    @property
+    def paginator(self):
+        # Old clients that still send ?page= keep the page-number format
+        if not hasattr(self, '_paginator'):
+            if StandardResultsSetPagination.page_query_param in self.request.query_params:
+                self._paginator = StandardResultsSetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
 
 @permission_classes([IsAuthenticated])
-class BookListView(generics.ListAPIView):
-    queryset = Books.objects.filter(is_available=True, is_deleted=False)
+class BookSearchView(generics.ListAPIView):
     serializer_class = BookSerializer
     pagination_class = StandardResultsSetPagination
+    query_budget = 3
+
+    def get_queryset(self):
+        serializer = BookSearchSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return BookService.search_books(serializer.validated_data['q'])
+
+
+@permission_classes([IsAuthenticated])
+class BookExportView(APIView):
+    # Rows are read while the response streams, after this budget is checked
+    query_budget = 1
+
+    def get(self, request):
+        serializer = BookExportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        export_format = serializer.validated_data['export_format']
+        rows = BookService.export_books(updated_since=serializer.validated_data.get('updated_since'))
+        if export_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="books.{export_format}"'
+        return response
+
+
+@permission_classes([IsAuthenticated])
+class BookFacetsView(APIView):
+    query_budget = 4
+
+    def get(self, request):
+        return Response(BookFacetService.get_facets())
+
+
+@permission_classes([IsAuthenticated])
+class BookDetailView(APIView):
+    query_budget = 2
+
+    def get(self, request, slug):
+        data = book_detail_cache.get_or_load(slug, lambda: BookService.get_book_detail(slug))
+        if data is None:
+            return Response({'error': 'Book not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
 
 
 @permission_classes([IsAuthenticated])
 class BookUploadView(APIView):
+    query_budget = 17
+
     def post(self, request):
         try:
             serializer = BookUploadSerializer(data=request.data)
@@ -40,7 +168,8 @@ class BookUploadView(APIView):
                         'book': {
                             'id': book.id,
                             'title': book.title,
-                            'slug': book.slug
+                            'slug': book.slug,
+                            'cover_status': book.cover_status
                         }
                     },
                     status=status.HTTP_201_CREATED
@@ -56,9 +185,11 @@ class BookUploadView(APIView):
 
 @permission_classes([IsAuthenticated])
 class BookEditView(APIView):
+    query_budget = 18
+
     def patch(self, request, slug):
         try:
-            serializer = BookEditSerializer(data=request.data)
+            serializer = BookEditSerializer(data=request.data, context={'slug': slug})
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -69,7 +200,8 @@ class BookEditView(APIView):
                     'book': {
                         'id': book.id,
                         'title': book.title,
-                        'slug': book.slug
+                        'slug': book.slug,
+                        'cover_status': book.cover_status
                     }
                 },
                 status=status.HTTP_200_OK
@@ -84,6 +216,8 @@ class BookEditView(APIView):
 
 @permission_classes([IsAuthenticated])
 class BookDeleteView(APIView):
+    query_budget = 6
+
     def delete(self, request, slug):
         try:
             serializer = BookDeleteSerializer(data={'slug': slug})
@@ -0,0 +1,40 @@
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+import hashlib
+
+
+def make_etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    # Returns a 304 response when the client's copy is current, otherwise None.
+    # ETag takes precedence; Last-Modified only has one-second resolution. Collection
+    # endpoints pass no last_modified: a removed row or a second change within the
+    # same second leaves it unchanged, so If-Modified-Since alone could return a stale 304.
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user data behind a bearer token: browsers may keep it but must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def set_public_validators(response, etag, max_age, immutable=False):
+    # Same bytes for every reader: shared caches and CDNs may keep it
+    response['ETag'] = etag
+    if immutable:
+        patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+# SQLite logs transaction control as queries while PostgreSQL does not, so they
+# are left out to keep budgets the same on both backends.
+TRANSACTION_STATEMENTS = {'BEGIN', 'COMMIT', 'ROLLBACK'}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def counted_queries(context):
+    return [query for query in context.captured_queries if query['sql'].strip().upper() not in TRANSACTION_STATEMENTS]
+
+
+@contextmanager
+def assert_max_queries(budget, using='default', label='Block'):
+    context = CaptureQueriesContext(connections[using])
+    with context:
+        yield context
+
+    queries = counted_queries(context)
+    if len(queries) > budget:
+        listing = '\n'.join(f"  {i}. {query['sql']}" for i, query in enumerate(queries, start=1))
+        raise QueryBudgetExceeded(f"{label} ran {len(queries)} queries, budget is {budget}:\n{listing}")
+
+
+class QueryBudgetMiddleware:
+    # Enabled in DEBUG only: fails any request whose view declares `query_budget`
+    # and runs more queries than that.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+        if budget is None:
+            return None
+
+        with assert_max_queries(budget, label=f"{view_class.__name__} ({request.method} {request.path})"):
+            return view_func(request, *view_args, **view_kwargs)
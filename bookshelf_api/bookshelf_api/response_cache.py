@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from django.core.cache import caches
+from django.db import transaction
+import hashlib, threading, time
+
+
+class VersionedResponseCache:
+    # Caches serialized responses under a namespace-wide version number. Writers call
+    # invalidate() instead of deleting keys: bumping the version orphans every entry,
+    # which then expires on its own. The version is a nanosecond timestamp, so it is
+    # unique without a read-modify-write and doubles as a Last-Modified value. It is
+    # stored without a timeout: if it expired, every entry (and every ETag built from
+    # it) would be orphaned at once although nothing changed.
+    #
+    # Any Django cache alias works as the backend, as long as every worker process uses
+    # the same one: with a per-process backend (locmem) an invalidation would only reach
+    # the process that made it. settings.py refuses locmem outside DEBUG.
+    def __init__(self, namespace, alias, timeout):
+        self.namespace = namespace
+        self.alias = alias
+        self.timeout = timeout
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    def get_version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            version = time.time_ns()
+            self.cache.set(self.version_key, version, None)
+        return version
+
+    def invalidate(self):
+        self.cache.set(self.version_key, time.time_ns(), None)
+
+    def invalidate_on_commit(self):
+        transaction.on_commit(self.invalidate)
+
+    @staticmethod
+    def version_datetime(version):
+        return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+    def make_key(self, version, *parts):
+        digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+        return f'{self.namespace}:{version}:{digest}'
+
+    def get_or_set(self, key, producer):
+        # Single flight: concurrent misses for one key in this process wait for the
+        # first caller instead of each running the producer.
+        value = self.cache.get(key)
+        if value is not None:
+            return value, True
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                value = self.cache.get(key)
+                if value is not None:
+                    return value, True
+                value = producer()
+                self.cache.set(key, value, self.timeout)
+                return value, False
+        finally:
+            with self._locks_guard:
+                if not lock.locked():
+                    self._locks.pop(key, None)
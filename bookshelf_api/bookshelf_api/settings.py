@@ -1,7 +1,8 @@
 from pathlib import Path
 from decouple import config, Csv
 from datetime import timedelta
-import cloudinary
+from django.core.exceptions import ImproperlyConfigured
+import cloudinary, tempfile
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,11 +42,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fails requests to views that go over their declared `query_budget`
+QUERY_BUDGET_ENFORCED = config('QUERY_BUDGET_ENFORCED', default=DEBUG, cast=bool)
+if DEBUG and QUERY_BUDGET_ENFORCED:
+    MIDDLEWARE.append('bookshelf_api.query_budget.QueryBudgetMiddleware')
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -134,6 +140,8 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -146,6 +154,52 @@ cloudinary.config (
     secure= True
 )
 
+# Cover media pipeline (see books.media and `manage.py process_media_jobs`)
+COVER_IMAGE_FORMAT = config('COVER_IMAGE_FORMAT', default='WEBP')
+COVER_STORAGE_BACKEND = config('COVER_STORAGE_BACKEND', default='books.media.CloudinaryCoverStorage')
+MEDIA_JOB_MAX_ATTEMPTS = config('MEDIA_JOB_MAX_ATTEMPTS', default=5, cast=int)
+MEDIA_JOB_RETRY_BACKOFF_SECONDS = config('MEDIA_JOB_RETRY_BACKOFF_SECONDS', default=30, cast=int)
+MEDIA_JOB_LEASE_SECONDS = config('MEDIA_JOB_LEASE_SECONDS', default=300, cast=int)
+
+# Process-local genre name -> id cache used on the book write path
+GENRE_CACHE_TTL_SECONDS = config('GENRE_CACHE_TTL_SECONDS', default=300, cast=int)
+GENRE_CACHE_MAX_SIZE = config('GENRE_CACHE_MAX_SIZE', default=1024, cast=int)
+
+# Serialized catalog pages and book details (books.caches). Every worker process must
+# see the same entries, or an invalidation only reaches the process that made it: the
+# default is a file-based cache shared by the workers of one host (Redis or Memcached
+# across hosts). A per-process backend (locmem) is only accepted with DEBUG.
+CATALOG_CACHE_BACKEND = config('CATALOG_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache')
+if CATALOG_CACHE_BACKEND.endswith('.LocMemCache') and not DEBUG:
+    raise ImproperlyConfigured("CATALOG_CACHE_BACKEND must be shared by all worker processes; LocMemCache is only allowed with DEBUG")
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': CATALOG_CACHE_BACKEND,
+        'LOCATION': config('CATALOG_CACHE_LOCATION', default=str(Path(tempfile.gettempdir()) / 'bookshelf_catalog')),
+    },
+}
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=60, cast=int)
+BOOK_DETAIL_CACHE_TIMEOUT = config('BOOK_DETAIL_CACHE_TIMEOUT', default=300, cast=int)
+BOOK_DETAIL_NEGATIVE_CACHE_TIMEOUT = config('BOOK_DETAIL_NEGATIVE_CACHE_TIMEOUT', default=30, cast=int)
+
+# Soft-deleted books are moved to the archive table after this many days
+BOOK_ARCHIVE_RETENTION_DAYS = config('BOOK_ARCHIVE_RETENTION_DAYS', default=30, cast=int)
+
+# Process-local cache of authenticated users (users.authentication.CachedJWTAuthentication)
+AUTH_USER_CACHE_TTL_SECONDS = config('AUTH_USER_CACHE_TTL_SECONDS', default=60, cast=int)
+AUTH_USER_CACHE_MAX_SIZE = config('AUTH_USER_CACHE_MAX_SIZE', default=10000, cast=int)
+
+# Public reading list snapshots (see reading_lists.snapshots and `manage.py build_list_snapshots`).
+# The unversioned share URL is cached for MAX_AGE seconds; versioned URLs never change.
+READING_LIST_SNAPSHOT_MAX_AGE = config('READING_LIST_SNAPSHOT_MAX_AGE', default=300, cast=int)
+READING_LIST_SNAPSHOTS_KEPT = config('READING_LIST_SNAPSHOTS_KEPT', default=3, cast=int)
+# A list whose build fails is retried after RETRY_SECONDS, doubling per failure up to MAX_RETRY_SECONDS
+READING_LIST_SNAPSHOT_RETRY_SECONDS = config('READING_LIST_SNAPSHOT_RETRY_SECONDS', default=60, cast=int)
+READING_LIST_SNAPSHOT_MAX_RETRY_SECONDS = config('READING_LIST_SNAPSHOT_MAX_RETRY_SECONDS', default=3600, cast=int)
+
 
 # Swagger
 # SWAGGER_SETTINGS = {
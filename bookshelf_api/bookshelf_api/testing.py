@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.test import APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from books.caches import genre_cache
+from users.caches import user_cache
+from .query_budget import assert_max_queries
+
+
+class APIBudgetTestCase(APITransactionTestCase):
+    # Transactions commit for real, so on_commit hooks (cache invalidation) run and the
+    # statements counted against a view's query_budget are the ones production sees:
+    # inside TestCase every atomic block would add a SAVEPOINT pair.
+    password = 'Pw!12345x'
+
+    def setUp(self):
+        # Process-local and Django caches outlive the flushed database between tests
+        for cache in caches.all():
+            cache.clear()
+        genre_cache.clear()
+        user_cache.clear()
+
+    def create_user(self, username='alice', **extra_fields):
+        return get_user_model().objects.create_user(
+            username=username, email=f'{username}@example.com', password=self.password, **extra_fields
+        )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def assertWithinBudget(self, view_class):
+        return assert_max_queries(view_class.query_budget, label=view_class.__name__)
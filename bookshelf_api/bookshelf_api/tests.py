@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import RequestFactory, TransactionTestCase
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, assert_max_queries, counted_queries
+
+
+class CountUsersView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    query_budget = 1
+
+    def get(self, request):
+        return Response({'count': get_user_model().objects.count()})
+
+
+class TwoCountsView(CountUsersView):
+    def get(self, request):
+        get_user_model().objects.exists()
+        return super().get(request)
+
+
+class QueryBudgetTests(TransactionTestCase):
+    def test_queries_over_budget_fail(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'Users ran 2 queries, budget is 1'):
+            with assert_max_queries(1, label='Users'):
+                get_user_model().objects.count()
+                get_user_model().objects.exists()
+
+    def test_transaction_control_is_not_counted(self):
+        with assert_max_queries(1) as context:
+            with transaction.atomic():
+                get_user_model().objects.count()
+        self.assertEqual(len(counted_queries(context)), 1)
+
+    def run_view(self, view_class):
+        middleware = QueryBudgetMiddleware(lambda request: None)
+        request = RequestFactory().get('/count/')
+        view = view_class.as_view()
+        return middleware.process_view(request, view, (), {})
+
+    def test_middleware_enforces_the_view_budget(self):
+        self.assertEqual(self.run_view(CountUsersView).status_code, 200)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'TwoCountsView (GET /count/) ran 2 queries'):
+            self.run_view(TwoCountsView)
+
+    def test_middleware_skips_views_without_a_budget(self):
+        class UnbudgetedView(TwoCountsView):
+            query_budget = None
+
+        self.assertIsNone(self.run_view(UnbudgetedView))
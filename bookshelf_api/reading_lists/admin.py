@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import ReadingList, ReadingListItem
+from .models import ReadingList, ReadingListItem, ReadingListSnapshot
 
 
 admin.site.register(ReadingList)
-admin.site.register(ReadingListItem)
\ No newline at end of file
+admin.site.register(ReadingListItem)
+
+
+@admin.register(ReadingListSnapshot)
+class ReadingListSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('reading_list', 'version', 'item_count', 'created_at')
+    exclude = ('content',)
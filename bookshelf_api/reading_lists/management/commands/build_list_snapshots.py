@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+import time
+from reading_lists.snapshots import ReadingListSnapshotService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the public snapshots of reading lists changed since their last snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help="Lists rebuilt per batch")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when nothing is stale")
+        parser.add_argument('--once', action='store_true', help="Process one batch and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            built = ReadingListSnapshotService.build_stale(limit=options['batch_size'])
+            if built:
+                self.stdout.write(f"Rebuilt {built} reading list snapshot(s)")
+            if options['once']:
+                break
+            if not built:
+                time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+RANK_STEP = 1024
+
+
+def spread_ranks(apps, schema_editor):
+    # Existing lists are numbered 1..n (with ties broken by most recent update);
+    # renumber them with gaps in that same order
+    ReadingListItem = apps.get_model('reading_lists', 'ReadingListItem')
+    list_ids = ReadingListItem.objects.values_list('reading_list_id', flat=True).distinct()
+    for list_id in list_ids.iterator():
+        items = list(ReadingListItem.objects.filter(reading_list_id=list_id).order_by('rank', '-updated_at', 'id').only('id'))
+        for position, item in enumerate(items, start=1):
+            item.rank = position * RANK_STEP
+        ReadingListItem.objects.bulk_update(items, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reading_lists', '0003_alter_readinglist_name'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='readinglistitem',
+            old_name='listing_order',
+            new_name='rank',
+        ),
+        migrations.AlterField(
+            model_name='readinglistitem',
+            name='rank',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterModelOptions(
+            name='readinglistitem',
+            options={'ordering': ['rank', 'id'], 'verbose_name': 'Reading List Item', 'verbose_name_plural': 'Reading List Items'},
+        ),
+        migrations.RunPython(spread_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='readinglistitem',
+            index=models.Index(fields=['reading_list', 'rank', 'id'], name='reading_list_items_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+def fill_projection(apps, schema_editor):
+    ReadingListItem = apps.get_model('reading_lists', 'ReadingListItem')
+    items = ReadingListItem.objects.select_related('book__author', 'book__genre').order_by('id')
+    batch = []
+    for item in items.iterator(chunk_size=1000):
+        book = item.book
+        item.book_title = book.title
+        item.book_slug = book.slug
+        item.book_author = book.author.username
+        item.book_genre = book.genre.name
+        item.book_published_date = book.published_date
+        item.book_is_available = book.is_available and not book.is_deleted
+        item.book_cover = book.cover_variants.get('thumbnail')
+        batch.append(item)
+        if len(batch) >= 1000:
+            ReadingListItem.objects.bulk_update(batch, PROJECTION_FIELDS)
+            batch = []
+    ReadingListItem.objects.bulk_update(batch, PROJECTION_FIELDS)
+
+
+PROJECTION_FIELDS = [
+    'book_title', 'book_slug', 'book_author', 'book_genre', 'book_published_date', 'book_is_available', 'book_cover'
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_cover_variants'),
+        ('reading_lists', '0004_readinglistitem_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_author',
+            field=models.CharField(blank=True, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_cover',
+            field=models.URLField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_genre',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_is_available',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_published_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_slug',
+            field=models.SlugField(blank=True, db_index=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='readinglistitem',
+            name='book_title',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(fill_projection, migrations.RunPython.noop),
+    ]
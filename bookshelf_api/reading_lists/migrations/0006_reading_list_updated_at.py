@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Lists with items take the time of their last item change instead of the migration time
+    ReadingList = apps.get_model('reading_lists', 'ReadingList')
+    ReadingListItem = apps.get_model('reading_lists', 'ReadingListItem')
+    last_change = ReadingListItem.objects.filter(reading_list=OuterRef('pk')).values('reading_list').annotate(
+        last=Max('updated_at')
+    ).values('last')
+    ReadingList.objects.filter(items__isnull=False).distinct().update(updated_at=Subquery(last_change))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reading_lists', '0005_item_book_projection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readinglist',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='readinglist',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='reading_lists_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:53
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def drop_duplicate_items(apps, schema_editor):
+    # Keeps the first occurrence of every book in a list
+    ReadingListItem = apps.get_model('reading_lists', 'ReadingListItem')
+    duplicates = ReadingListItem.objects.values('reading_list', 'book').annotate(
+        copies=Count('id'), keep=Min('id')
+    ).filter(copies__gt=1)
+    for duplicate in duplicates.iterator():
+        ReadingListItem.objects.filter(
+            reading_list=duplicate['reading_list'], book=duplicate['book']
+        ).exclude(id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_book_facets'),
+        ('reading_lists', '0006_reading_list_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='readinglistitem',
+            constraint=models.UniqueConstraint(fields=('reading_list', 'book'), name='reading_list_items_book_uniq'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reading_lists', '0007_unique_list_book'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readinglist',
+            name='is_public',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='readinglist',
+            name='share_token',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='readinglist',
+            name='snapshot_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='readinglist',
+            name='snapshot_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ReadingListSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('content', models.BinaryField()),
+                ('etag', models.CharField(max_length=80)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reading_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='reading_lists.readinglist')),
+            ],
+            options={
+                'verbose_name': 'Reading List Snapshot',
+                'verbose_name_plural': 'Reading List Snapshots',
+                'constraints': [models.UniqueConstraint(fields=('reading_list', 'version'), name='reading_list_snapshots_version_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Foreign keys whose deletes PostgreSQL cascades itself. Their rows have nothing
+# pointing at them and no delete signals, so nothing is lost by skipping Django's
+# collector. Other backends keep the plain constraint.
+DATABASE_CASCADES = [
+    ('readinglistitem', 'reading_list'),
+    ('readinglistitem', 'book'),
+    ('readinglistsnapshot', 'reading_list'),
+]
+
+
+def replace_foreign_keys(apps, schema_editor, on_delete):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    qn = schema_editor.quote_name
+    for model_name, field_name in DATABASE_CASCADES:
+        model = apps.get_model('reading_lists', model_name)
+        field = model._meta.get_field(field_name)
+        table, column = model._meta.db_table, field.column
+        names = schema_editor._constraint_names(model, [column], foreign_key=True)
+        for name in names:
+            schema_editor.execute(f"ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(name)}")
+        name = names[0] if names else f"{table}_{column}_fk"
+        schema_editor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} FOREIGN KEY ({qn(column)}) "
+            f"REFERENCES {qn(field.related_model._meta.db_table)} ({qn(field.target_field.column)}) "
+            f"{on_delete} DEFERRABLE INITIALLY DEFERRED"
+        )
+
+
+def add_cascades(apps, schema_editor):
+    replace_foreign_keys(apps, schema_editor, 'ON DELETE CASCADE')
+
+
+def remove_cascades(apps, schema_editor):
+    replace_foreign_keys(apps, schema_editor, 'ON DELETE NO ACTION')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_book_facets'),
+        ('reading_lists', '0008_list_snapshots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='readinglistitem',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='reading_list_items', to='books.books'),
+        ),
+        migrations.AlterField(
+            model_name='readinglistitem',
+            name='reading_list',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='items', to='reading_lists.readinglist'),
+        ),
+        migrations.AlterField(
+            model_name='readinglistsnapshot',
+            name='reading_list',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='snapshots', to='reading_lists.readinglist'),
+        ),
+        migrations.RunPython(add_cascades, remove_cascades),
+    ]
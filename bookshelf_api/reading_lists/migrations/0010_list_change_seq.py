@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reading_lists', '0009_database_cascades'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readinglist',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='readinglist',
+            name='snapshot_seq',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
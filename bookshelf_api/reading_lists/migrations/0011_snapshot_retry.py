@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reading_lists', '0010_list_change_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readinglist',
+            name='snapshot_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='readinglist',
+            name='snapshot_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,31 +1,95 @@
 from django.db import models
 
 
+# Gap left between neighbouring ranks; inserts take the midpoint of their neighbours
+RANK_STEP = 1024
+
+
 class ReadingList(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey('users.Users', to_field='id', on_delete=models.CASCADE, related_name='reading_lists')
+    # Bumped by every change to the list or its items (see ReadingListService.lock)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Incremented in the same UPDATE as every change to the list or its items; unlike
+    # updated_at it cannot sort before a snapshot taken while the change was waiting
+    change_seq = models.PositiveBigIntegerField(default=0)
+    # Public sharing: anonymous readers get the latest snapshot through share_token
+    is_public = models.BooleanField(default=False)
+    share_token = models.CharField(max_length=32, unique=True, blank=True, null=True)
+    snapshot_version = models.PositiveIntegerField(default=0)
+    snapshot_at = models.DateTimeField(blank=True, null=True)
+    # change_seq the current snapshot was rendered from; the list is stale while they differ
+    snapshot_seq = models.PositiveBigIntegerField(blank=True, null=True)
+    # Failed builds in a row; the worker leaves the list alone until snapshot_retry_at
+    snapshot_failures = models.PositiveIntegerField(default=0)
+    snapshot_retry_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         verbose_name = 'Reading List'
         verbose_name_plural = 'Reading Lists'
+        indexes = [
+            models.Index(fields=['user', 'updated_at', 'id'], name='reading_lists_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ReadingListSnapshot(models.Model):
+    # Rendered page of a public list, gzip-compressed JSON. Never changed once written:
+    # a list change produces the next version.
+    # ON DELETE CASCADE is done by PostgreSQL (migration 0009), not by Django's collector;
+    # other backends delete snapshots explicitly (see services.cascades_in_database)
+    reading_list = models.ForeignKey(ReadingList, on_delete=models.DO_NOTHING, related_name='snapshots')
+    version = models.PositiveIntegerField()
+    content = models.BinaryField()
+    etag = models.CharField(max_length=80)
+    item_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reading List Snapshot'
+        verbose_name_plural = 'Reading List Snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['reading_list', 'version'], name='reading_list_snapshots_version_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.reading_list} v{self.version}"
+
+
 class ReadingListItem(models.Model):
-    reading_list = models.ForeignKey(ReadingList, on_delete=models.CASCADE, related_name='items')
-    book = models.ForeignKey('books.Books', on_delete=models.CASCADE, related_name='reading_list_items')
-    listing_order = models.PositiveIntegerField(default=0)
+    # ON DELETE CASCADE is done by PostgreSQL (migration 0009): deleting a list or a book
+    # is one statement, without loading its items into memory. Other backends delete the
+    # items with one extra statement (see services.cascades_in_database)
+    reading_list = models.ForeignKey(ReadingList, on_delete=models.DO_NOTHING, related_name='items')
+    book = models.ForeignKey('books.Books', on_delete=models.DO_NOTHING, related_name='reading_list_items')
+    # Sparse sort key: only order matters, positions are computed when reading
+    rank = models.BigIntegerField(default=0)
+    # Copy of what list pages show about the book, kept in sync by reading_lists.signals
+    # so a page is read from this table alone
+    book_title = models.CharField(max_length=255, blank=True)
+    book_slug = models.SlugField(max_length=255, blank=True, null=True, db_index=False)
+    book_author = models.CharField(max_length=150, blank=True)
+    book_genre = models.CharField(max_length=100, blank=True)
+    book_published_date = models.DateField(blank=True, null=True)
+    book_is_available = models.BooleanField(default=True)
+    book_cover = models.URLField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Reading List Item'
         verbose_name_plural = 'Reading List Items'
-        ordering = ['listing_order', '-updated_at']
+        ordering = ['rank', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['reading_list', 'book'], name='reading_list_items_book_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['reading_list', 'rank', 'id'], name='reading_list_items_rank_idx'),
+        ]
 
 
     def __str__(self):
-        return f"{self.book.title}"
+        return self.book_title
 
@@ -1,20 +1,39 @@
+from collections.abc import Mapping
 from rest_framework import serializers
-from books.serializers import BookSerializer
 from .models import ReadingList, ReadingListItem
 
 
 class ReadingListItemSerializer(serializers.ModelSerializer):
-    book = BookSerializer(read_only=True)
+    # Same shape as BookSerializer, built from the item's projection columns
+    book = serializers.SerializerMethodField()
+    # 1-based position in the list, set by ReadingListService.get_paginated_items
+    listing_order = serializers.IntegerField(source='position', read_only=True)
 
     class Meta:
         model = ReadingListItem
         fields = ['id', 'book', 'listing_order']
 
+    def get_book(self, obj):
+        return {
+            'id': obj.book_id,
+            'title': obj.book_title,
+            'author': obj.book_author,
+            'genre': obj.book_genre,
+            'published_date': obj.book_published_date,
+            'is_available': obj.book_is_available,
+            'slug': obj.book_slug,
+            'cover_thumbnail': obj.book_cover,
+        }
+
 
 class ReadingListSerializer(serializers.ModelSerializer):
+    # Annotated by ReadingListService.get_list_summaries / attach_preview_covers
+    item_count = serializers.IntegerField(read_only=True)
+    preview_covers = serializers.ListField(child=serializers.URLField(), read_only=True)
+
     class Meta:
         model = ReadingList
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'item_count', 'updated_at', 'preview_covers', 'is_public', 'share_token']
 
 
 class ReadingListCreateSerializer(serializers.ModelSerializer):
@@ -36,13 +55,63 @@ class ReadingListUpdateSerializer(serializers.ModelSerializer):
         fields = ['name']
 
 
-class AddBookToListSerializer(serializers.Serializer):
-    book_id = serializers.IntegerField()
+# Largest number of books added or removed by one request
+MAX_BATCH_BOOKS = 500
+
+
+class BookIdsSerializer(serializers.Serializer):
+    # Either one `book_id` or a `book_ids` array; repeated ids are taken once
+    book_id = serializers.IntegerField(required=False)
+    book_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_BATCH_BOOKS
+    )
+
+    def validate(self, data):
+        if ('book_id' in data) == ('book_ids' in data):
+            raise serializers.ValidationError("Provide exactly one of 'book_id' or 'book_ids'.")
+        if 'book_ids' in data:
+            data['book_ids'] = list(dict.fromkeys(data['book_ids']))
+        return data
+
+
+class AddBookToListSerializer(BookIdsSerializer):
     listing_order = serializers.IntegerField(required=False, min_value=1)
 
 
-class RemoveBookFromListSerializer(serializers.Serializer):
+class RemoveBookFromListSerializer(BookIdsSerializer):
+    pass
+
+
+class CloneReadingListSerializer(serializers.Serializer):
+    # Defaults to "<source name> (copy)", numbered when the user already has one
+    name = serializers.CharField(required=False, max_length=255)
+
+
+class MergeReadingListsSerializer(serializers.Serializer):
+    source_id = serializers.IntegerField()
+
+
+class MoveSerializer(serializers.Serializer):
     book_id = serializers.IntegerField()
+    before = serializers.IntegerField(required=False)
+    after = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if ('before' in data) == ('after' in data):
+            raise serializers.ValidationError("Provide exactly one of 'before' or 'after'.")
+        if data['book_id'] == data.get('before', data.get('after')):
+            raise serializers.ValidationError("A book cannot be moved relative to itself.")
+        return data
+
+
+class MoveBooksSerializer(serializers.Serializer):
+    # A `moves` array, or a single move as the whole body
+    moves = MoveSerializer(many=True, allow_empty=False, max_length=100)
+
+    def to_internal_value(self, data):
+        if isinstance(data, Mapping) and 'moves' not in data and 'book_id' in data:
+            data = {'moves': [data]}
+        return super().to_internal_value(data)
 
 
 class ReorderListSerializer(serializers.Serializer):
@@ -1,14 +1,29 @@
-from django.db import transaction, IntegrityError
-from django.db.models import F, Max
+from django.db import connection, transaction, IntegrityError
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    BigIntegerField, BooleanField, Case, Count, ExpressionWrapper, F, OuterRef, Q, Subquery, Value, When, Window
+)
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 from django.core.paginator import Paginator, EmptyPage
-import logging
-from books.models import Books
-from .models import ReadingList, ReadingListItem
+import itertools, logging
+from books.models import Books, Genre
+from .models import RANK_STEP, ReadingList, ReadingListItem, ReadingListSnapshot
 
 
 logger = logging.getLogger(__name__)
 
+# Cover thumbnails shown for each list on the "my lists" page
+PREVIEW_COVERS = 4
+
+
+def cascades_in_database():
+    # Migration 0009 adds ON DELETE CASCADE on PostgreSQL only; elsewhere the items and
+    # snapshots are deleted explicitly before the rows they point at
+    return connection.vendor == 'postgresql'
+
 class ReadingListService:
     @staticmethod
     def create_reading_list(user, name):
@@ -21,57 +36,221 @@ class ReadingListService:
             logger.error(f"Failed to create reading list: {name}")
             raise ValidationError("Failed to create reading list due to an unexpected error.")
 
+    @staticmethod
+    def lock(reading_list):
+        # Row lock serializing writers of one list; the same UPDATE records the change
+        ReadingList.objects.filter(pk=reading_list.pk).update(updated_at=timezone.now(), change_seq=F('change_seq') + 1)
+
+    @staticmethod
+    def mark_changed(items):
+        # For writes to items that do not go through lock(): locks and bumps the lists of
+        # `items` before the items are written, the order lock() takes them in
+        ReadingList.objects.filter(pk__in=items.values('reading_list_id')).update(change_seq=F('change_seq') + 1)
+
+    @staticmethod
+    def get_list_summaries(user):
+        return ReadingList.objects.filter(user=user).annotate(item_count=Count('items')).order_by('-updated_at', '-id')
+
+    @staticmethod
+    def rename_list(reading_list, name):
+        # Bumps change_seq like any other list write, and saves the name alone so the
+        # loaded copies of the counters and share fields are not written back
+        with transaction.atomic():
+            ReadingListService.lock(reading_list)
+            reading_list.name = name
+            reading_list.save(update_fields=['name', 'updated_at'])
+        return reading_list
+
+    @staticmethod
+    def attach_preview_covers(reading_lists, size=PREVIEW_COVERS):
+        # First `size` covers of every list on the page, in list order, from one query
+        previews = {reading_list.id: [] for reading_list in reading_lists}
+        if not previews:
+            return reading_lists
+        covers = ReadingListItem.objects.filter(reading_list__in=previews, book_cover__isnull=False).annotate(
+            preview_rank=Window(RowNumber(), partition_by=F('reading_list'), order_by=[F('rank'), F('id')])
+        ).filter(preview_rank__lte=size).order_by('reading_list', 'rank', 'id').values_list('reading_list_id', 'book_cover')
+        for reading_list_id, cover in covers:
+            previews[reading_list_id].append(cover)
+        for reading_list in reading_lists:
+            reading_list.preview_covers = previews[reading_list.id]
+        return reading_lists
+
+    @staticmethod
+    def get_readable_list(user, list_id):
+        # A user's own lists and the curated lists kept by staff accounts
+        return ReadingList.objects.get(Q(user=user) | Q(user__is_staff=True), id=list_id)
+
+    @staticmethod
+    def clone_list(source, user, name=None):
+        with transaction.atomic():
+            if name is None:
+                reading_list = ReadingList.objects.create(user=user, name=ReadingListService.copy_name(user, source.name))
+            else:
+                reading_list = ReadingListService.create_reading_list(user, name)
+            copied = ReadingListService.copy_items(source, reading_list, base_rank=0)
+        return reading_list, copied
+
+    @staticmethod
+    def copy_name(user, name):
+        # "<name> (copy)", then "<name> (copy 2)", ...: the first one the user does not have
+        base = f"{name[:240]} (copy"
+        taken = set(ReadingList.objects.filter(user=user, name__startswith=base).values_list('name', flat=True))
+        candidates = (f"{base})" if number == 1 else f"{base} {number})" for number in itertools.count(1))
+        return next(candidate for candidate in candidates if candidate not in taken)
+
+    @staticmethod
+    def merge_lists(source, target):
+        # Appends the books of `source` missing from `target`, in source order
+        if source.pk == target.pk:
+            raise ValidationError("A reading list cannot be merged into itself.")
+        with transaction.atomic():
+            ReadingListService.lock(target)
+            base_rank = ReadingListItem.objects.filter(reading_list=target).order_by('rank', 'id').values_list(
+                'rank', flat=True
+            ).last() or 0
+            return ReadingListService.copy_items(source, target, base_rank)
+
+    @staticmethod
+    def copy_items(source, target, base_rank):
+        # Single INSERT … SELECT: items never pass through Python, so the cost on the app
+        # side does not depend on the list size. Ranks continue from `base_rank` with full
+        # gaps; unavailable books and books already in `target` are skipped.
+        meta = ReadingListItem._meta
+        qn = connection.ops.quote_name
+        table = qn(meta.db_table)
+        column = lambda name: qn(meta.get_field(name).column)
+        copied = [column(name) for name in ['book', *ReadingListProjection.FIELDS]]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ({column('reading_list')}, {column('rank')}, {column('created_at')}, {column('updated_at')}, {', '.join(copied)})
+                SELECT %s, %s + ROW_NUMBER() OVER (ORDER BY source.{column('rank')}, source.{column('id')}) * %s, %s, %s,
+                       {', '.join(f'source.{name}' for name in copied)}
+                FROM {table} source
+                WHERE source.{column('reading_list')} = %s AND source.{column('book_is_available')} AND NOT EXISTS (
+                    SELECT 1 FROM {table} existing
+                    WHERE existing.{column('reading_list')} = %s AND existing.{column('book')} = source.{column('book')}
+                )
+                ON CONFLICT ({column('reading_list')}, {column('book')}) DO NOTHING
+                """,
+                [target.pk, base_rank, RANK_STEP, now, now, source.pk, target.pk]
+            )
+            return cursor.rowcount
+
     @staticmethod
     def add_book_to_list(reading_list, book_id, listing_order=None):
-        if ReadingListItem.objects.filter(reading_list=reading_list, book_id=book_id).exists():
-            raise ValidationError("Book already in list")
-        book = Books.objects.get(id=book_id)
-        if book.is_deleted or not book.is_available:
+        # Duplicates are caught by the (reading_list, book) constraint instead of a pre-check
+        book = Books.objects.select_related('author', 'genre').get(id=book_id)
+        if not book.is_available:
             raise ValidationError("Book not found or unavailable")
         try:
             with transaction.atomic():
-                if listing_order is not None:
-                    ReadingListItem.objects.filter(
-                        reading_list=reading_list,
-                        listing_order__gte=listing_order
-                    ).update(listing_order=F('listing_order') + 1)
-                    ReadingListItem.objects.create(reading_list=reading_list, book=book, listing_order=listing_order)
-                else:
-                    max_order = ReadingListItem.objects.filter(reading_list=reading_list).aggregate(Max('listing_order'))['listing_order__max']
-                    new_order = (max_order or 0) + 1
-                    ReadingListItem.objects.create(reading_list=reading_list, book=book, listing_order=new_order)
+                # Serializes rank allocation (and rebalancing) per list
+                ReadingListService.lock(reading_list)
+                rank = ReadingListService.ranks_for_position(reading_list, listing_order)[0]
+                ReadingListItem.objects.create(
+                    reading_list=reading_list, book=book, rank=rank, **ReadingListProjection.book_values(book)
+                )
+        except IntegrityError:
+            # The whole transaction is rolled back, lock update included. Only a committed
+            # (reading_list, book) row makes this a duplicate; other violations propagate.
+            if ReadingListItem.objects.filter(reading_list=reading_list, book=book).exists():
+                raise ValidationError("Book already in list")
+            raise
+
+    @staticmethod
+    def add_books_to_list(reading_list, book_ids, listing_order=None):
+        # Adds the books in the given order, as one block at `listing_order` (end of list
+        # when None). Returns {book_id: 'added' | 'already_in_list' | 'unavailable' | 'not_found'}.
+        books = Books.objects.select_related('author', 'genre').in_bulk(book_ids)
+        results = {
+            book_id: 'not_found' if book_id not in books else 'unavailable' if not books[book_id].is_available else None
+            for book_id in book_ids
+        }
+        candidates = [book_id for book_id, result in results.items() if result is None]
+        if not candidates:
+            return results
+        try:
+            with transaction.atomic():
+                # Serializes rank allocation (and rebalancing) per list
+                ReadingListService.lock(reading_list)
+                present = set(ReadingListItem.objects.filter(
+                    reading_list=reading_list, book_id__in=candidates
+                ).values_list('book_id', flat=True))
+                new_ids = [book_id for book_id in candidates if book_id not in present]
+                ranks = ReadingListService.ranks_for_position(reading_list, listing_order, len(new_ids)) if new_ids else []
+                # ON CONFLICT DO NOTHING: the constraint stays the last word on duplicates
+                ReadingListItem.objects.bulk_create([
+                    ReadingListItem(
+                        reading_list=reading_list, book=books[book_id], rank=rank,
+                        **ReadingListProjection.book_values(books[book_id])
+                    )
+                    for book_id, rank in zip(new_ids, ranks)
+                ], ignore_conflicts=True)
 
         except IntegrityError:
-            logger.error(f"Failed to add book to list: {book.id}")
+            logger.error(f"Failed to add books to list {reading_list.pk}: {candidates}")
             raise ValidationError("Failed to add book to list due to an unexpected error.")
+        for book_id in candidates:
+            results[book_id] = 'already_in_list' if book_id in present else 'added'
+        return results
+
+    @staticmethod
+    def delete_list(reading_list):
+        with transaction.atomic():
+            if not cascades_in_database():
+                ReadingListItem.objects.filter(reading_list=reading_list).delete()
+                ReadingListSnapshot.objects.filter(reading_list=reading_list).delete()
+            reading_list.delete()
+
+    @staticmethod
+    def delete_book_items(book_ids):
+        if not cascades_in_database():
+            ReadingListItem.objects.filter(book_id__in=book_ids).delete()
 
     @staticmethod
     def remove_book_from_list(reading_list, book):
-        try:
-            item = ReadingListItem.objects.get(reading_list=reading_list, book=book)
-            order = item.listing_order
-            item.delete()
-            ReadingListItem.objects.filter(reading_list=reading_list, listing_order__gt=order).update(listing_order=F('listing_order') - 1)
-        except ReadingListItem.DoesNotExist:
+        if ReadingListService.remove_books_from_list(reading_list, [book.id])[book.id] != 'removed':
             logger.error(f"Failed to remove book from list: {book.id}")
             raise ValidationError("Book not in list.")
+
+    @staticmethod
+    def remove_books_from_list(reading_list, book_ids):
+        # Returns {book_id: 'removed' | 'not_in_list'}
+        try:
+            with transaction.atomic():
+                ReadingListService.lock(reading_list)
+                items = ReadingListItem.objects.filter(reading_list=reading_list, book_id__in=book_ids)
+                present = set(items.values_list('book_id', flat=True))
+                if present:
+                    # Items have no dependents, so this is a single DELETE … WHERE book_id IN
+                    items.delete()
         except Exception as e:
-            logger.error(f"Unexpected error removing book from list: {e}")
+            logger.error(f"Unexpected error removing books from list: {e}")
             raise ValidationError("Internal server error")
+        return {book_id: 'removed' if book_id in present else 'not_in_list' for book_id in book_ids}
 
     @staticmethod
     def reorder_list(reading_list, book_ids):
         try:
-            current_items = ReadingListItem.objects.filter(reading_list=reading_list)
-            current_book_ids = [item.book_id for item in current_items]
-            if set(book_ids) != set(current_book_ids):
-                raise ValidationError("Provided book IDs do not match the list.")
-            if set(book_ids) == set(current_book_ids):
-                raise ValidationError("No changes detected")
             with transaction.atomic():
-                for order, book_id in enumerate(book_ids, start=1):
-                    ReadingListItem.objects.filter(reading_list=reading_list, book_id=book_id).update(listing_order=order)
-        
+                ReadingListService.lock(reading_list)
+                current = list(
+                    ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank', 'id').values_list('id', 'book_id')
+                )
+                current_book_ids = [book_id for _, book_id in current]
+                if set(book_ids) != set(current_book_ids):
+                    raise ValidationError("Provided book IDs do not match the list.")
+                if book_ids == current_book_ids:
+                    raise ValidationError("No changes detected")
+
+                item_ids = {book_id: item_id for item_id, book_id in current}
+                ReadingListService.write_ranks({
+                    item_ids[book_id]: position * RANK_STEP for position, book_id in enumerate(book_ids, start=1)
+                })
+
         except ValidationError as e:
             logger.error(f"Validation error during reordering: {e}")
             raise e
@@ -80,12 +259,190 @@ class ReadingListService:
             raise ValidationError("Failed to reorder list due to an unexpected error")
 
     @staticmethod
-    def get_paginated_items(reading_list, page, page_size):
-        items = ReadingListItem.objects.filter(reading_list=reading_list).order_by('listing_order')
+    def move_books(reading_list, moves):
+        # moves: [{'book_id': X, 'before': Y} or {'book_id': X, 'after': Y}], applied in order.
+        # The order is worked out in memory from (id, book, rank) tuples; only the moved
+        # items are written (every item if the list needs rebalancing), in one statement.
+        with transaction.atomic():
+            ReadingListService.lock(reading_list)
+            order = [
+                [item_id, book_id, rank] for item_id, book_id, rank in
+                ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank', 'id').values_list('id', 'book_id', 'rank')
+            ]
+            changed = {}
+            rebalance = False
+
+            for move in moves:
+                anchor_id = move.get('before', move.get('after'))
+                positions = {entry[1]: index for index, entry in enumerate(order)}
+                for book_id in (move['book_id'], anchor_id):
+                    if book_id not in positions:
+                        raise ValidationError(f"Book {book_id} is not in the list.")
+
+                entry = order.pop(positions[move['book_id']])
+                anchor_index = next(index for index, other in enumerate(order) if other[1] == anchor_id)
+                index = anchor_index if 'before' in move else anchor_index + 1
+                lower = order[index - 1][2] if index > 0 else None
+                upper = order[index][2] if index < len(order) else None
+
+                if lower is None and upper is None:
+                    entry[2] = RANK_STEP
+                elif lower is None:
+                    entry[2] = upper - RANK_STEP
+                elif upper is None:
+                    entry[2] = lower + RANK_STEP
+                elif upper - lower > 1:
+                    entry[2] = (lower + upper) // 2
+                else:
+                    rebalance = True
+                order.insert(index, entry)
+                changed[entry[0]] = entry[2]
+
+            if rebalance:
+                changed = {entry[0]: position * RANK_STEP for position, entry in enumerate(order, start=1)}
+            ReadingListService.write_ranks(changed)
+
+    @staticmethod
+    def write_ranks(ranks):
+        # {item id: rank} applied with a single CASE update
+        if not ranks:
+            return
+        ReadingListItem.objects.filter(id__in=ranks).update(
+            rank=Case(*[When(id=item_id, then=Value(rank)) for item_id, rank in ranks.items()], output_field=BigIntegerField()),
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def get_paginated_items(reading_list, page, page_size, count=None):
+        # One range scan over (reading_list, rank, id); book fields come from the projection
+        items = ReadingListItem.objects.filter(reading_list=reading_list).only(
+            'id', 'rank', 'book_id', *ReadingListProjection.FIELDS
+        ).order_by('rank', 'id')
         paginator = Paginator(items, page_size)
+        if count is not None:
+            # Already known by the caller; skips the COUNT(*)
+            paginator.count = count
         try:
             page_obj = paginator.page(page)
         except EmptyPage:
             raise ValidationError("Page not found.")
+        for position, item in enumerate(page_obj.object_list, start=page_obj.start_index()):
+            item.position = position
         return page_obj
 
+    @staticmethod
+    def ranks_for_position(reading_list, position=None, count=1):
+        # Ascending ranks for `count` new items starting at 1-based `position` (end of list
+        # when None or past the end). Reads at most two neighbouring ranks; writes nothing
+        # unless the gap between them is used up.
+        items = ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank', 'id')
+        if position is None:
+            last_rank = items.values_list('rank', flat=True).last() or 0
+            return [last_rank + step * RANK_STEP for step in range(1, count + 1)]
+
+        if position <= 1:
+            first_rank = items.values_list('rank', flat=True).first()
+            if first_rank is None:
+                return [step * RANK_STEP for step in range(1, count + 1)]
+            return [first_rank - step * RANK_STEP for step in range(count, 0, -1)]
+
+        neighbours = list(items.values_list('rank', flat=True)[position - 2:position])
+        if not neighbours:
+            return ReadingListService.ranks_for_position(reading_list, None, count)
+        if len(neighbours) == 1:
+            return [neighbours[0] + step * RANK_STEP for step in range(1, count + 1)]
+        before, after = neighbours
+        if after - before > count:
+            spacing = (after - before) // (count + 1)
+            return [before + step * spacing for step in range(1, count + 1)]
+
+        # Renumber with room for the new items right before `position`
+        ReadingListService.rebalance(reading_list, room_at=position, room=count)
+        return [(position - 1 + step) * RANK_STEP for step in range(1, count + 1)]
+
+    @staticmethod
+    def rebalance(reading_list, room_at=None, room=0):
+        # Renumbers one list with full gaps, keeping its order, optionally leaving `room`
+        # empty slots before 1-based position `room_at`. Only needed after many inserts
+        # into the same spot; callers hold the list lock.
+        items = list(ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank', 'id').only('id'))
+        for position, item in enumerate(items, start=1):
+            if room_at is not None and position >= room_at:
+                position += room
+            item.rank = position * RANK_STEP
+        ReadingListItem.objects.bulk_update(items, ['rank'], batch_size=500)
+        logger.info(f"Rebalanced reading list {reading_list.pk} ({len(items)} items)")
+
+
+class ReadingListProjection:
+    # Maintains the book_* columns of ReadingListItem. Each sync is a single UPDATE over
+    # the items of the changed book, genre or author (see reading_lists.signals).
+    FIELDS = [
+        'book_title', 'book_slug', 'book_author', 'book_genre', 'book_published_date', 'book_is_available', 'book_cover'
+    ]
+    # Books fields the projection is derived from
+    BOOK_SOURCES = {
+        'title', 'slug', 'author', 'author_id', 'genre', 'genre_id', 'published_date', 'is_available', 'is_deleted',
+        'cover_variants',
+    }
+
+    @staticmethod
+    def book_values(book):
+        # For a book loaded with its author and genre
+        return {
+            'book_title': book.title,
+            'book_slug': book.slug,
+            'book_author': book.author.username,
+            'book_genre': book.genre.name,
+            'book_published_date': book.published_date,
+            'book_is_available': book.is_available and not book.is_deleted,
+            'book_cover': book.cover_variants.get('thumbnail'),
+        }
+
+    @staticmethod
+    def sync_book(book):
+        # Author and genre names are read by subqueries so nothing is fetched first
+        items = ReadingListItem.objects.filter(book_id=book.pk)
+        ReadingListService.mark_changed(items)
+        items.update(
+            book_title=book.title,
+            book_slug=book.slug,
+            book_author=Subquery(get_user_model().objects.filter(pk=book.author_id).values('username')[:1]),
+            book_genre=Subquery(Genre.objects.filter(pk=book.genre_id).values('name')[:1]),
+            book_published_date=book.published_date,
+            book_is_available=book.is_available and not book.is_deleted,
+            book_cover=book.cover_variants.get('thumbnail'),
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def sync_books(book_ids):
+        # Re-reads every column from the books, for rows changed without a post_save
+        book = Books.all_objects.filter(pk=OuterRef('book_id'))
+        items = ReadingListItem.objects.filter(book_id__in=book_ids)
+        ReadingListService.mark_changed(items)
+        items.update(
+            book_title=Subquery(book.values('title')),
+            book_slug=Subquery(book.values('slug')),
+            book_author=Subquery(book.values('author__username')),
+            book_genre=Subquery(book.values('genre__name')),
+            book_published_date=Subquery(book.values('published_date')),
+            book_is_available=Subquery(book.annotate(
+                live=ExpressionWrapper(Q(is_available=True, is_deleted=False), output_field=BooleanField())
+            ).values('live')),
+            book_cover=Subquery(book.annotate(thumbnail=KeyTextTransform('thumbnail', 'cover_variants')).values('thumbnail')),
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def sync_genre(genre):
+        items = ReadingListItem.objects.filter(book__genre_id=genre.pk)
+        ReadingListService.mark_changed(items)
+        items.update(book_genre=genre.name, updated_at=timezone.now())
+
+    @staticmethod
+    def sync_author(user):
+        items = ReadingListItem.objects.filter(book__author_id=user.pk)
+        ReadingListService.mark_changed(items)
+        items.update(book_author=user.username, updated_at=timezone.now())
+
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from books.models import Books, Genre
+from books.signals import books_deleting, books_updated
+from .services import ReadingListProjection, ReadingListService
+
+
+def touches(update_fields, sources):
+    return update_fields is None or bool(set(update_fields) & sources)
+
+
+@receiver(post_save, sender=Books)
+def book_saved(sender, instance, created, update_fields, **kwargs):
+    if not created and touches(update_fields, ReadingListProjection.BOOK_SOURCES):
+        ReadingListProjection.sync_book(instance)
+
+
+@receiver(books_updated, sender=Books)
+def books_updated_in_bulk(sender, book_ids, **kwargs):
+    ReadingListProjection.sync_books(book_ids)
+
+
+@receiver(books_deleting, sender=Books)
+def books_deleted(sender, book_ids, **kwargs):
+    ReadingListService.delete_book_items(book_ids)
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, update_fields, **kwargs):
+    if not created and touches(update_fields, {'name'}):
+        ReadingListProjection.sync_genre(instance)
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def user_loaded(sender, instance, **kwargs):
+    # A full save() of a profile (email only, say) must not resync every item
+    instance._projected_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    # Skips the last_login update on every login
+    if created or not touches(update_fields, {'username'}):
+        return
+    if instance.username != instance._projected_username:
+        ReadingListProjection.sync_author(instance)
+        instance._projected_username = instance.username
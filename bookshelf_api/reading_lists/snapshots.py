@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from datetime import timedelta
+import gzip, hashlib, logging, secrets
+from .models import ReadingList, ReadingListItem, ReadingListSnapshot
+from .serializers import ReadingListItemSerializer
+from .services import ReadingListProjection
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReadingListSnapshotService:
+    # Public lists are read from precomputed snapshots, so anonymous traffic never touches
+    # the item table. Writers only bump the list's change_seq; the build_list_snapshots
+    # worker renders the next version of every public list whose snapshot_seq is behind.
+    @staticmethod
+    def publish(reading_list):
+        if reading_list.is_public:
+            return reading_list
+        reading_list.is_public = True
+        reading_list.share_token = secrets.token_urlsafe(16)
+        with transaction.atomic():
+            ReadingList.objects.filter(pk=reading_list.pk).update(is_public=True, share_token=reading_list.share_token)
+            # The first version is built right away so the link works immediately
+            ReadingListSnapshotService.build(reading_list)
+        return reading_list
+
+    @staticmethod
+    def unpublish(reading_list):
+        # Versions keep counting up across publications, so a versioned URL never
+        # changes meaning; the share token is replaced, which retires old links
+        with transaction.atomic():
+            ReadingList.objects.filter(pk=reading_list.pk).update(is_public=False, share_token=None)
+            ReadingListSnapshot.objects.filter(reading_list=reading_list).delete()
+        reading_list.is_public = False
+        reading_list.share_token = None
+
+    @staticmethod
+    def render(reading_list, built_at):
+        items = list(ReadingListItem.objects.filter(reading_list=reading_list).only(
+            'id', 'rank', 'book_id', *ReadingListProjection.FIELDS
+        ).order_by('rank', 'id'))
+        for position, item in enumerate(items, start=1):
+            item.position = position
+        return JSONRenderer().render({
+            'id': reading_list.id,
+            'name': reading_list.name,
+            'version': reading_list.snapshot_version + 1,
+            'updated_at': built_at,
+            'count': len(items),
+            'results': ReadingListItemSerializer(items, many=True).data,
+        }), len(items)
+
+    @staticmethod
+    def build(reading_list):
+        with transaction.atomic():
+            # Writers of the list wait on this row lock, so nothing changes while rendering
+            reading_list = ReadingList.objects.select_for_update().get(pk=reading_list.pk)
+            if not reading_list.is_public:
+                return None
+            built_at = timezone.now()
+            body, item_count = ReadingListSnapshotService.render(reading_list, built_at)
+            version = reading_list.snapshot_version + 1
+            snapshot = ReadingListSnapshot.objects.create(
+                reading_list=reading_list,
+                version=version,
+                content=gzip.compress(body),
+                etag=f'W/"{hashlib.sha256(body).hexdigest()[:32]}"',
+                item_count=item_count,
+            )
+            # Bumps wait on the row lock too, so this is the change_seq of exactly what was rendered
+            ReadingList.objects.filter(pk=reading_list.pk).update(
+                snapshot_version=version, snapshot_at=built_at, snapshot_seq=reading_list.change_seq,
+                snapshot_failures=0, snapshot_retry_at=None
+            )
+            # Older versions stay readable for a while for clients that just fetched a link to them
+            ReadingListSnapshot.objects.filter(
+                reading_list=reading_list, version__lte=version - settings.READING_LIST_SNAPSHOTS_KEPT
+            ).delete()
+        return snapshot
+
+    @staticmethod
+    def stale_lists():
+        return ReadingList.objects.filter(is_public=True).filter(
+            Q(snapshot_seq__isnull=True) | ~Q(snapshot_seq=F('change_seq'))
+        )
+
+    @staticmethod
+    def build_stale(limit=20):
+        # Returns the number of snapshots built. Lists that failed wait out their backoff,
+        # so a list that always fails neither heads every batch nor keeps the worker awake.
+        now = timezone.now()
+        stale = ReadingListSnapshotService.stale_lists().filter(
+            Q(snapshot_retry_at__isnull=True) | Q(snapshot_retry_at__lte=now)
+        ).order_by('snapshot_at').values_list('id', 'snapshot_failures')[:limit]
+        built = 0
+        for list_id, failures in list(stale):
+            try:
+                if ReadingListSnapshotService.build(ReadingList(pk=list_id)):
+                    built += 1
+            except Exception as e:
+                logger.error(f"Failed to build snapshot for reading list {list_id}: {e}")
+                ReadingListSnapshotService.record_failure(list_id, failures)
+        return built
+
+    @staticmethod
+    def record_failure(list_id, failures):
+        delay = min(
+            settings.READING_LIST_SNAPSHOT_RETRY_SECONDS * 2 ** failures, settings.READING_LIST_SNAPSHOT_MAX_RETRY_SECONDS
+        )
+        ReadingList.objects.filter(pk=list_id).update(
+            snapshot_failures=F('snapshot_failures') + 1, snapshot_retry_at=timezone.now() + timedelta(seconds=delay)
+        )
+
+    @staticmethod
+    def get_snapshot(share_token, version=None):
+        # Latest version unless one is asked for; a single query either way
+        snapshots = ReadingListSnapshot.objects.filter(reading_list__share_token=share_token, reading_list__is_public=True)
+        if version is None:
+            snapshots = snapshots.filter(version=F('reading_list__snapshot_version'))
+        else:
+            snapshots = snapshots.filter(version=version)
+        return snapshots.first()
@@ -1,3 +1,393 @@
-from django.test import TestCase
+from django.db import IntegrityError
+from django.utils import timezone
+from datetime import date, timedelta
+from unittest import mock
+import gzip, json
+from bookshelf_api.testing import APIBudgetTestCase
+from books.models import Books
+from books.services import BookArchiveService, BookPurgeService, BookService
+from books.signals import books_updated
+from .models import RANK_STEP, ReadingList, ReadingListItem, ReadingListSnapshot
+from .services import ReadingListProjection, ReadingListService
+from .snapshots import ReadingListSnapshotService
+from .views import (
+    CreateReadingListView, UpdateReadingListView, DeleteReadingListView, ListReadingListsView, AddBookToListView,
+    RemoveBookFromListView, ReorderListView, MoveBooksInListView, CloneReadingListView, MergeReadingListsView,
+    ListBooksInListView, PublishReadingListView, SharedReadingListView
+)
 
-# Create your tests here.
+
+class ReadingListTestCase(APIBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.authenticate(self.user)
+        self.books = [self.create_book(f'Book {i}') for i in range(8)]
+        self.book_ids = [book.id for book in self.books]
+
+    def create_book(self, title):
+        return BookService.create_book(
+            {'title': title, 'pages': 100, 'genre': 'Fiction', 'published_date': date(2020, 1, 1)}, self.user
+        )
+
+    def create_list(self, name='Favourites', book_ids=(), user=None):
+        reading_list = ReadingList.objects.create(user=user or self.user, name=name)
+        if book_ids:
+            ReadingListService.add_books_to_list(reading_list, list(book_ids))
+        return reading_list
+
+    def list_book_ids(self, reading_list):
+        return list(ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank', 'id').values_list(
+            'book_id', flat=True
+        ))
+
+
+class ReadingListEndpointBudgetTests(ReadingListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reading_list = self.create_list(book_ids=self.book_ids[:4])
+        self.url = f'/api/reading-lists/{self.reading_list.id}'
+
+    def test_create(self):
+        with self.assertWithinBudget(CreateReadingListView):
+            response = self.client.post('/api/reading-lists/create/', {'name': 'To read'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        with self.assertWithinBudget(UpdateReadingListView):
+            response = self.client.put(f'{self.url}/update/', {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        empty = self.create_list('Empty')
+        with self.assertWithinBudget(DeleteReadingListView):
+            response = self.client.delete(f'/api/reading-lists/{empty.id}/delete/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_list(self):
+        for i in range(3):
+            self.create_list(f'List {i}', self.book_ids[i:i + 3])
+        with self.assertWithinBudget(ListReadingListsView):
+            response = self.client.get('/api/reading-lists/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 4)
+
+    def test_add_one(self):
+        with self.assertWithinBudget(AddBookToListView):
+            response = self.client.post(f'{self.url}/add-book/', {'book_id': self.book_ids[5]}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_add_many(self):
+        with self.assertWithinBudget(AddBookToListView):
+            response = self.client.post(
+                f'{self.url}/add-book/', {'book_ids': self.book_ids[3:], 'listing_order': 2}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_add_with_rebalance(self):
+        # No gap left between the first two items
+        ReadingListItem.objects.filter(reading_list=self.reading_list, book_id=self.book_ids[1]).update(rank=RANK_STEP + 1)
+        with self.assertWithinBudget(AddBookToListView):
+            response = self.client.post(
+                f'{self.url}/add-book/', {'book_id': self.book_ids[5], 'listing_order': 2}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_remove_one(self):
+        with self.assertWithinBudget(RemoveBookFromListView):
+            response = self.client.delete(f'{self.url}/remove-book/', {'book_id': self.book_ids[0]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_remove_many(self):
+        with self.assertWithinBudget(RemoveBookFromListView):
+            response = self.client.delete(f'{self.url}/remove-book/', {'book_ids': self.book_ids[:3]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_reorder(self):
+        with self.assertWithinBudget(ReorderListView):
+            response = self.client.patch(f'{self.url}/reorder/', {'book_ids': self.book_ids[3::-1]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_move(self):
+        moves = [{'book_id': self.book_ids[0], 'after': self.book_ids[3]}, {'book_id': self.book_ids[2], 'before': self.book_ids[1]}]
+        with self.assertWithinBudget(MoveBooksInListView):
+            response = self.client.post(f'{self.url}/move/', {'moves': moves}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_clone(self):
+        with self.assertWithinBudget(CloneReadingListView):
+            response = self.client.post(f'{self.url}/clone/', {'name': 'Copy'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_clone_without_a_name(self):
+        with self.assertWithinBudget(CloneReadingListView):
+            response = self.client.post(f'{self.url}/clone/', {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.client.post(f'{self.url}/clone/', {}, format='json')
+        self.assertEqual(
+            list(ReadingList.objects.filter(user=self.user).order_by('id').values_list('name', flat=True)),
+            ['Favourites', 'Favourites (copy)', 'Favourites (copy 2)'],
+        )
+        response = self.client.post(f'{self.url}/clone/', {'name': 'Favourites'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_merge(self):
+        target = self.create_list('Target', self.book_ids[2:6])
+        with self.assertWithinBudget(MergeReadingListsView):
+            response = self.client.post(
+                f'/api/reading-lists/{target.id}/merge/', {'source_id': self.reading_list.id}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_books(self):
+        with self.assertWithinBudget(ListBooksInListView):
+            response = self.client.get(f'{self.url}/list-books/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        with self.assertWithinBudget(ListBooksInListView):
+            response = self.client.get(f'{self.url}/list-books/', {'page_size': 2}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_publish_and_unpublish(self):
+        with self.assertWithinBudget(PublishReadingListView):
+            response = self.client.post(f'{self.url}/publish/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertWithinBudget(PublishReadingListView):
+            response = self.client.delete(f'{self.url}/publish/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_shared(self):
+        ReadingListSnapshotService.publish(self.reading_list)
+        self.client.credentials()
+        with self.assertWithinBudget(SharedReadingListView):
+            response = self.client.get(f'/api/reading-lists/shared/{self.reading_list.share_token}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 4)
+
+
+class ReadingListRankTests(ReadingListTestCase):
+    def test_inserts_at_a_position(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        ReadingListService.add_book_to_list(reading_list, self.book_ids[3], listing_order=1)
+        ReadingListService.add_book_to_list(reading_list, self.book_ids[4], listing_order=3)
+        ReadingListService.add_books_to_list(reading_list, self.book_ids[5:7], listing_order=99)
+        self.assertEqual(self.list_book_ids(reading_list), [
+            self.book_ids[3], self.book_ids[0], self.book_ids[4], self.book_ids[1], self.book_ids[2],
+            self.book_ids[5], self.book_ids[6],
+        ])
+
+    def test_repeated_inserts_rebalance_the_list(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:2])
+        expected = self.list_book_ids(reading_list)
+        # Halving a gap of RANK_STEP runs out after log2(RANK_STEP) inserts at one spot
+        for title in [f'Extra {i}' for i in range(12)]:
+            book = self.create_book(title)
+            ReadingListService.add_book_to_list(reading_list, book.id, listing_order=2)
+            expected.insert(1, book.id)
+        self.assertEqual(self.list_book_ids(reading_list), expected)
+
+        ranks = list(ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank').values_list('rank', flat=True))
+        self.assertEqual(len(set(ranks)), len(ranks))
+
+    def test_rebalance_leaves_room(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        ReadingListService.rebalance(reading_list, room_at=2, room=2)
+        ranks = list(ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank').values_list('rank', flat=True))
+        self.assertEqual(ranks, [RANK_STEP, 4 * RANK_STEP, 5 * RANK_STEP])
+
+    def test_move_books(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:4])
+        a, b, c, d = self.book_ids[:4]
+        ReadingListService.move_books(reading_list, [{'book_id': a, 'after': d}, {'book_id': c, 'before': b}])
+        self.assertEqual(self.list_book_ids(reading_list), [c, b, d, a])
+
+    def test_move_endpoint_accepts_a_single_move(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        a, b, c = self.book_ids[:3]
+        url = f'/api/reading-lists/{reading_list.id}/move/'
+        response = self.client.post(url, {'book_id': a, 'after': c}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.list_book_ids(reading_list), [b, c, a])
+
+        response = self.client.post(url, {'book_id': a, 'before': b, 'after': c}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('moves', response.data)
+        self.assertEqual(self.client.post(url, {}, format='json').status_code, 400)
+
+    def test_moves_into_a_used_up_gap_rebalance(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        a, b, c = self.book_ids[:3]
+        ReadingListItem.objects.filter(reading_list=reading_list, book_id=b).update(rank=RANK_STEP + 1)
+        ReadingListService.move_books(reading_list, [{'book_id': c, 'after': a}])
+        self.assertEqual(self.list_book_ids(reading_list), [a, c, b])
+        ranks = list(ReadingListItem.objects.filter(reading_list=reading_list).order_by('rank').values_list('rank', flat=True))
+        self.assertEqual(ranks, [RANK_STEP, 2 * RANK_STEP, 3 * RANK_STEP])
+
+    def test_list_books_positions(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:5])
+        response = self.client.get(f'/api/reading-lists/{reading_list.id}/list-books/', {'page': 2, 'page_size': 2})
+        self.assertEqual(
+            [(item['listing_order'], item['book']['id']) for item in response.data['results']],
+            [(3, self.book_ids[2]), (4, self.book_ids[3])]
+        )
+
+
+class ReadingListAddTests(ReadingListTestCase):
+    def test_duplicates_are_rejected(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:1])
+        response = self.client.post(
+            f'/api/reading-lists/{reading_list.id}/add-book/', {'book_id': self.book_ids[0]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], ['Book already in list'])
+
+    def test_other_integrity_errors_propagate(self):
+        reading_list = self.create_list()
+        with mock.patch.object(ReadingListItem.objects, 'create', side_effect=IntegrityError('FOREIGN KEY constraint failed')):
+            with self.assertRaises(IntegrityError):
+                ReadingListService.add_book_to_list(reading_list, self.book_ids[0])
+        self.assertEqual(self.list_book_ids(reading_list), [])
+
+
+class ReadingListProjectionTests(ReadingListTestCase):
+    def test_book_changes_reach_list_items(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:2])
+        etag = self.client.get(f'/api/reading-lists/{reading_list.id}/list-books/')['ETag']
+
+        self.client.patch('/api/books/edit/book-0/', {'title': 'Renamed'}, format='multipart')
+        response = self.client.get(f'/api/reading-lists/{reading_list.id}/list-books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['book']['title'], 'Renamed')
+        self.assertEqual(response.data['results'][0]['book']['slug'], 'renamed')
+
+        self.client.delete('/api/books/delete/book-1/')
+        item = ReadingListItem.objects.get(reading_list=reading_list, book_id=self.book_ids[1])
+        self.assertFalse(item.book_is_available)
+
+
+    def test_bulk_book_updates_reach_list_items(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:2])
+        changed = Books.all_objects.filter(pk=self.book_ids[0])
+        changed.update(title='Renamed', slug='renamed', is_deleted=True, cover_variants={'thumbnail': 'https://example.com/t.jpg'})
+        books_updated.send(sender=Books, book_ids=[self.book_ids[0]])
+
+        book = Books.all_objects.select_related('author', 'genre').get(pk=self.book_ids[0])
+        item = ReadingListItem.objects.get(reading_list=reading_list, book_id=book.pk)
+        for field, value in ReadingListProjection.book_values(book).items():
+            self.assertEqual(getattr(item, field), value, field)
+        other = ReadingListItem.objects.get(reading_list=reading_list, book_id=self.book_ids[1])
+        self.assertEqual(other.book_slug, 'book-1')
+
+
+    def test_only_username_changes_reach_list_items(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:2])
+        change_seq = ReadingList.objects.get(pk=reading_list.pk).change_seq
+
+        self.client.patch('/api/profile/', {'email': 'alice@example.org'}, format='json')
+        self.assertEqual(ReadingList.objects.get(pk=reading_list.pk).change_seq, change_seq)
+
+        self.client.patch('/api/profile/', {'username': 'alicia'}, format='json')
+        self.assertGreater(ReadingList.objects.get(pk=reading_list.pk).change_seq, change_seq)
+        self.assertEqual(
+            set(ReadingListItem.objects.filter(reading_list=reading_list).values_list('book_author', flat=True)),
+            {'alicia'}
+        )
+
+
+class ReadingListSnapshotTests(ReadingListTestCase):
+    def stale_ids(self):
+        return list(ReadingListSnapshotService.stale_lists().values_list('id', flat=True))
+
+    def test_changes_mark_the_list_stale_until_rebuilt(self):
+        reading_list = ReadingListSnapshotService.publish(self.create_list(book_ids=self.book_ids[:2]))
+        self.assertEqual(self.stale_ids(), [])
+
+        self.client.patch('/api/books/edit/book-0/', {'title': 'Renamed'}, format='multipart')
+        self.assertEqual(self.stale_ids(), [reading_list.id])
+        self.assertEqual(ReadingListSnapshotService.build_stale(), 1)
+        self.assertEqual(self.stale_ids(), [])
+        snapshot = ReadingListSnapshotService.get_snapshot(reading_list.share_token)
+        self.assertEqual(json.loads(gzip.decompress(snapshot.content))['results'][0]['book']['title'], 'Renamed')
+
+    def test_renames_mark_the_list_stale(self):
+        reading_list = ReadingListSnapshotService.publish(self.create_list(book_ids=self.book_ids[:2]))
+        share_token = reading_list.share_token
+        self.client.put(f'/api/reading-lists/{reading_list.id}/update/', {'name': 'Renamed'}, format='json')
+        self.assertEqual(self.stale_ids(), [reading_list.id])
+
+        ReadingListSnapshotService.build_stale()
+        reading_list.refresh_from_db()
+        self.assertEqual((reading_list.is_public, reading_list.share_token), (True, share_token))
+        snapshot = ReadingListSnapshotService.get_snapshot(share_token)
+        self.assertEqual(json.loads(gzip.decompress(snapshot.content))['name'], 'Renamed')
+
+    def test_failed_builds_back_off(self):
+        broken = ReadingListSnapshotService.publish(self.create_list('Broken', book_ids=self.book_ids[:2]))
+        ReadingListSnapshotService.publish(self.create_list('Working', book_ids=self.book_ids[:2]))
+        self.client.patch('/api/books/edit/book-0/', {'title': 'Renamed'}, format='multipart')
+
+        render = ReadingListSnapshotService.render
+        def failing_render(reading_list, built_at):
+            if reading_list.pk == broken.pk:
+                raise ValueError("Unrenderable")
+            return render(reading_list, built_at)
+
+        with mock.patch.object(ReadingListSnapshotService, 'render', side_effect=failing_render) as patched:
+            self.assertEqual(ReadingListSnapshotService.build_stale(), 1)
+            self.assertEqual(self.stale_ids(), [broken.id])
+            self.assertEqual(ReadingListSnapshotService.build_stale(), 0)
+            self.assertEqual(patched.call_count, 2)
+
+        broken.refresh_from_db()
+        self.assertEqual(broken.snapshot_failures, 1)
+        ReadingList.objects.filter(pk=broken.pk).update(snapshot_retry_at=timezone.now())
+        self.assertEqual(ReadingListSnapshotService.build_stale(), 1)
+        broken.refresh_from_db()
+        self.assertEqual((broken.snapshot_failures, broken.snapshot_retry_at), (0, None))
+
+    def test_changes_timestamped_before_the_snapshot_are_not_missed(self):
+        # A writer that read the clock before a build and got the lock after it
+        reading_list = ReadingListSnapshotService.publish(self.create_list(book_ids=self.book_ids[:2]))
+        reading_list.refresh_from_db()
+        earlier = reading_list.snapshot_at - timedelta(seconds=1)
+        with mock.patch('reading_lists.services.timezone.now', return_value=earlier):
+            ReadingListService.remove_books_from_list(reading_list, [self.book_ids[0]])
+        self.assertEqual(self.stale_ids(), [reading_list.id])
+
+        ReadingListSnapshotService.build_stale()
+        with mock.patch('reading_lists.services.timezone.now', return_value=earlier):
+            ReadingListProjection.sync_book(Books.objects.get(pk=self.book_ids[1]))
+        self.assertEqual(self.stale_ids(), [reading_list.id])
+
+
+class ReadingListConditionalTests(ReadingListTestCase):
+    def test_removal_is_not_answered_with_304(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        url = f'/api/reading-lists/{reading_list.id}/list-books/'
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.client.delete(f'/api/reading-lists/{reading_list.id}/remove-book/', {'book_id': self.book_ids[0]}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+
+class ReadingListDeletionTests(ReadingListTestCase):
+    def test_delete_removes_items_and_snapshots(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        ReadingListSnapshotService.publish(reading_list)
+        with self.assertWithinBudget(DeleteReadingListView):
+            response = self.client.delete(f'/api/reading-lists/{reading_list.id}/delete/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ReadingListItem.objects.filter(reading_list_id=reading_list.id).exists())
+        self.assertFalse(ReadingListSnapshot.objects.filter(reading_list_id=reading_list.id).exists())
+
+    def test_deleted_books_leave_their_lists(self):
+        reading_list = self.create_list(book_ids=self.book_ids[:3])
+        self.client.delete('/api/books/delete/book-0/')
+        self.assertEqual(BookArchiveService.archive_batch(timezone.now() + timedelta(seconds=1), 10), 1)
+        self.assertEqual(self.list_book_ids(reading_list), self.book_ids[1:3])
+
+        BookPurgeService.purge_author_batch(self.user.id, 10)
+        self.assertEqual(self.list_book_ids(reading_list), [])
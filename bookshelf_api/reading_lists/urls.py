@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     CreateReadingListView, UpdateReadingListView, DeleteReadingListView, ListReadingListsView,
-    AddBookToListView, RemoveBookFromListView, ReorderListView, ListBooksInListView
+    AddBookToListView, RemoveBookFromListView, ReorderListView, ListBooksInListView,
+    MoveBooksInListView, CloneReadingListView, MergeReadingListsView, PublishReadingListView, SharedReadingListView
 )
 
 
@@ -13,6 +14,12 @@ urlpatterns = [
     path('<int:list_id>/add-book/', AddBookToListView.as_view(), name='add_book_to_list'),
     path('<int:list_id>/remove-book/', RemoveBookFromListView.as_view(), name='remove_book_from_list'),
     path('<int:list_id>/reorder/', ReorderListView.as_view(), name='reorder_list'),
+    path('<int:list_id>/move/', MoveBooksInListView.as_view(), name='move_books_in_list'),
+    path('<int:list_id>/clone/', CloneReadingListView.as_view(), name='clone_reading_list'),
+    path('<int:list_id>/merge/', MergeReadingListsView.as_view(), name='merge_reading_lists'),
+    path('<int:list_id>/publish/', PublishReadingListView.as_view(), name='publish_reading_list'),
+    path('shared/<str:share_token>/', SharedReadingListView.as_view(), name='shared_reading_list'),
+    path('shared/<str:share_token>/v<int:version>/', SharedReadingListView.as_view(), name='shared_reading_list_version'),
     path('<int:list_id>/list-books/', ListBooksInListView.as_view(), name='list_books_in_list'),
 ]
 
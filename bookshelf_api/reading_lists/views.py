@@ -1,15 +1,24 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import ValidationError
-from rest_framework.decorators import permission_classes
-import logging
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.decorators import authentication_classes, permission_classes
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.conf import settings
+from django.db.models import Count, Max
+import gzip, logging
+from bookshelf_api.conditional import make_etag, not_modified, set_public_validators, set_validators
 from books.models import Books
+from books.pagination import StandardResultsSetPagination
 from .models import ReadingList
-from .services import ReadingListService
+from .services import ReadingListService, cascades_in_database
+from .snapshots import ReadingListSnapshotService
 from .serializers import (
     ReadingListSerializer, ReadingListCreateSerializer, ReadingListUpdateSerializer, AddBookToListSerializer,
-    RemoveBookFromListSerializer, ReorderListSerializer, ReadingListItemSerializer
+    RemoveBookFromListSerializer, ReorderListSerializer, ReadingListItemSerializer, MoveBooksSerializer,
+    CloneReadingListSerializer, MergeReadingListsSerializer
 )
 
 
@@ -17,6 +26,8 @@ logger = logging.getLogger(__name__)
 
 @permission_classes([IsAuthenticated])
 class CreateReadingListView(APIView):
+    query_budget = 3
+
     def post(self, request):
         try:
             serializer = ReadingListCreateSerializer(data=request.data)
@@ -35,12 +46,15 @@ class CreateReadingListView(APIView):
 
 @permission_classes([IsAuthenticated])
 class UpdateReadingListView(APIView):
+    query_budget = 5
+
     def put(self, request, list_id):
         try:
             reading_list = ReadingList.objects.get(user=request.user, id=list_id)
             serializer = ReadingListUpdateSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
-                serializer.update(reading_list, serializer.validated_data)
+                if 'name' in serializer.validated_data:
+                    ReadingListService.rename_list(reading_list, serializer.validated_data['name'])
                 return Response({'message': 'Reading list updated'}, status=200)
             
             return Response(serializer.errors, status=400)
@@ -54,10 +68,13 @@ class UpdateReadingListView(APIView):
 
 @permission_classes([IsAuthenticated])
 class DeleteReadingListView(APIView):
+    # PostgreSQL cascades the items and snapshots; other backends delete them first
+    query_budget = 4 if cascades_in_database() else 6
+
     def delete(self, request, list_id):
         try:
             reading_list = ReadingList.objects.get(user=request.user, id=list_id)
-            reading_list.delete()
+            ReadingListService.delete_list(reading_list)
             return Response({'message': 'Reading list deleted'}, status=200)
         except ReadingList.DoesNotExist:
             logger.error(f"Reading list not found for deletion: {list_id}")
@@ -69,11 +86,20 @@ class DeleteReadingListView(APIView):
 
 @permission_classes([IsAuthenticated])
 class ListReadingListsView(APIView):
+    # Count, page of lists with item counts, preview covers for the page
+    query_budget = 4
+
     def get(self, request):
         try:
-            reading_lists = ReadingList.objects.filter(user=request.user)
+            paginator = StandardResultsSetPagination()
+            reading_lists = paginator.paginate_queryset(
+                ReadingListService.get_list_summaries(request.user), request, view=self
+            )
+            ReadingListService.attach_preview_covers(reading_lists)
             serializer = ReadingListSerializer(reading_lists, many=True)
-            return Response(serializer.data)
+            return paginator.get_paginated_response(serializer.data)
+        except NotFound as e:
+            return Response({'error': e.detail}, status=404)
         except Exception as e:
             logger.error(f"Error listing reading lists: {e}")
             return Response({'error': 'Internal server error'}, status=500)
@@ -81,13 +107,29 @@ class ListReadingListsView(APIView):
 
 @permission_classes([IsAuthenticated])
 class AddBookToListView(APIView):
+    # 6 for one book, 7 for a batch; a rebalance of the list adds a read and batched rank updates
+    query_budget = 9
+
     def post(self, request, list_id):
         try:
             reading_list = ReadingList.objects.get(user=request.user, id=list_id)
             serializer = AddBookToListSerializer(data=request.data)
             if serializer.is_valid():
-                book_id = serializer.validated_data['book_id']
                 listing_order = serializer.validated_data.get('listing_order')
+                if 'book_ids' in serializer.validated_data:
+                    results = ReadingListService.add_books_to_list(
+                        reading_list, serializer.validated_data['book_ids'], listing_order
+                    )
+                    added = sum(result == 'added' for result in results.values())
+                    return Response(
+                        {
+                            'message': f'{added} books added to list',
+                            'results': [{'book_id': book_id, 'status': result} for book_id, result in results.items()]
+                        },
+                        status=201 if added else 200
+                    )
+
+                book_id = serializer.validated_data['book_id']
                 ReadingListService.add_book_to_list(reading_list, book_id, listing_order)
 
                 return Response({'message': 'Book added to list'}, status=201)
@@ -107,13 +149,29 @@ class AddBookToListView(APIView):
 
 @permission_classes([IsAuthenticated])
 class RemoveBookFromListView(APIView):
+    # 6 for one book (its row is read for the 404), 5 for a batch
+    query_budget = 6
+
     def delete(self, request, list_id):
         try:
             reading_list = ReadingList.objects.get(user=request.user, id=list_id)
             serializer = RemoveBookFromListSerializer(data=request.data)
             if serializer.is_valid():
+                if 'book_ids' in serializer.validated_data:
+                    # Ids of deleted or unknown books are reported as not in the list
+                    results = ReadingListService.remove_books_from_list(reading_list, serializer.validated_data['book_ids'])
+                    removed = sum(result == 'removed' for result in results.values())
+                    return Response(
+                        {
+                            'message': f'{removed} books removed from list',
+                            'results': [{'book_id': book_id, 'status': result} for book_id, result in results.items()]
+                        },
+                        status=200
+                    )
+
                 book_id = serializer.validated_data['book_id']
-                book = Books.objects.get(id=book_id)
+                # Deleted books can still be taken off a list
+                book = Books.all_objects.get(id=book_id)
                 ReadingListService.remove_book_from_list(reading_list, book)
 
                 return Response({'message': 'Book removed from list'}, status=200)
@@ -134,6 +192,8 @@ class RemoveBookFromListView(APIView):
 
 @permission_classes([IsAuthenticated])
 class ReorderListView(APIView):
+    query_budget = 5
+
     def patch(self, request, list_id):
         try:
             reading_list = ReadingList.objects.get(user=request.user, id=list_id)
@@ -154,21 +214,104 @@ class ReorderListView(APIView):
             return Response({'error': 'Internal server error'}, status=500)
 
 
+@permission_classes([IsAuthenticated])
+class MoveBooksInListView(APIView):
+    query_budget = 5
+
+    def post(self, request, list_id):
+        try:
+            reading_list = ReadingList.objects.get(user=request.user, id=list_id)
+            serializer = MoveBooksSerializer(data=request.data)
+            if serializer.is_valid():
+                moves = serializer.validated_data['moves']
+                ReadingListService.move_books(reading_list, moves)
+
+                return Response({'message': f'Moved {len(moves)} book(s)'}, status=200)
+            return Response(serializer.errors, status=400)
+
+        except ReadingList.DoesNotExist:
+            return Response({'error': 'Reading list not found'}, status=404)
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Unexpected error moving books in list: {e}")
+            return Response({'error': 'Internal server error'}, status=500)
+
+
+@permission_classes([IsAuthenticated])
+class CloneReadingListView(APIView):
+    query_budget = 5
+
+    def post(self, request, list_id):
+        try:
+            source = ReadingListService.get_readable_list(request.user, list_id)
+            serializer = CloneReadingListSerializer(data=request.data)
+            if serializer.is_valid():
+                name = serializer.validated_data.get('name')
+                reading_list, copied = ReadingListService.clone_list(source, request.user, name)
+                return Response({'message': 'Reading list cloned', 'id': reading_list.id, 'copied': copied}, status=201)
+            return Response(serializer.errors, status=400)
+
+        except ReadingList.DoesNotExist:
+            return Response({'error': 'Reading list not found'}, status=404)
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Unexpected error cloning reading list: {e}")
+            return Response({'error': 'Internal server error'}, status=500)
+
+
+@permission_classes([IsAuthenticated])
+class MergeReadingListsView(APIView):
+    query_budget = 6
+
+    def post(self, request, list_id):
+        try:
+            target = ReadingList.objects.get(user=request.user, id=list_id)
+            serializer = MergeReadingListsSerializer(data=request.data)
+            if serializer.is_valid():
+                source = ReadingListService.get_readable_list(request.user, serializer.validated_data['source_id'])
+                copied = ReadingListService.merge_lists(source, target)
+                return Response({'message': 'Reading lists merged', 'copied': copied}, status=200)
+            return Response(serializer.errors, status=400)
+
+        except ReadingList.DoesNotExist:
+            return Response({'error': 'Reading list not found'}, status=404)
+        except ValidationError as e:
+            return Response({'error': e.detail}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Unexpected error merging reading lists: {e}")
+            return Response({'error': 'Internal server error'}, status=500)
+
+
 @permission_classes([IsAuthenticated])
 class ListBooksInListView(APIView):
+    query_budget = 5
+
     def get(self, request, list_id):
         try:
             reading_list = ReadingList.objects.get(user=request.user, id=list_id)
             page = request.query_params.get('page', 1)
             page_size = request.query_params.get('page_size', 10)
-            page_obj = ReadingListService.get_paginated_items(reading_list, int(page), int(page_size))
+
+            # Book changes reach the items through the projection sync, which bumps their
+            # updated_at; adds, removals and reorders bump the list's (ReadingListService.lock)
+            state = reading_list.items.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+            last_modified = max(filter(None, [state['last_modified'], reading_list.updated_at]))
+            etag = make_etag('list', reading_list.id, last_modified, state['count'], page, page_size)
+            not_modified_response = not_modified(request, etag)
+            if not_modified_response is not None:
+                return not_modified_response
+
+            page_obj = ReadingListService.get_paginated_items(reading_list, int(page), int(page_size), count=state['count'])
             serializer = ReadingListItemSerializer(page_obj.object_list, many=True)
-            return Response({
+            response = Response({
                 'count': page_obj.paginator.count,
                 'next': page_obj.next_page_number() if page_obj.has_next() else None,
                 'previous': page_obj.previous_page_number() if page_obj.has_previous() else None,
                 'results': serializer.data
             })
+            return set_validators(response, etag, last_modified)
         
         except ReadingList.DoesNotExist:
             return Response({'error': 'Reading list not found'}, status=404)
@@ -178,3 +321,64 @@ class ListBooksInListView(APIView):
             logger.error(f"Error listing books: {e}")
             return Response({'error': 'An unexpected error occurred'}, status=500)
 
+
+@permission_classes([IsAuthenticated])
+class PublishReadingListView(APIView):
+    query_budget = 9
+
+    def post(self, request, list_id):
+        try:
+            reading_list = ReadingList.objects.get(user=request.user, id=list_id)
+            ReadingListSnapshotService.publish(reading_list)
+            url = request.build_absolute_uri(reverse('shared_reading_list', args=[reading_list.share_token]))
+            return Response({'message': 'Reading list published', 'share_token': reading_list.share_token, 'url': url}, status=200)
+        except ReadingList.DoesNotExist:
+            return Response({'error': 'Reading list not found'}, status=404)
+        except Exception as e:
+            logger.error(f"Error publishing reading list: {e}")
+            return Response({'error': 'Internal server error'}, status=500)
+
+    def delete(self, request, list_id):
+        try:
+            reading_list = ReadingList.objects.get(user=request.user, id=list_id)
+            ReadingListSnapshotService.unpublish(reading_list)
+            return Response({'message': 'Reading list unpublished'}, status=200)
+        except ReadingList.DoesNotExist:
+            return Response({'error': 'Reading list not found'}, status=404)
+        except Exception as e:
+            logger.error(f"Error unpublishing reading list: {e}")
+            return Response({'error': 'Internal server error'}, status=500)
+
+
+@authentication_classes([])
+@permission_classes([AllowAny])
+class SharedReadingListView(APIView):
+    # Served straight from the stored snapshot; the versioned URL never changes content
+    query_budget = 1
+    immutable_max_age = 365 * 24 * 60 * 60
+
+    def get(self, request, share_token, version=None):
+        try:
+            snapshot = ReadingListSnapshotService.get_snapshot(share_token, version)
+            if snapshot is None:
+                return Response({'error': 'Reading list not found'}, status=404)
+
+            if version is None:
+                max_age, immutable = settings.READING_LIST_SNAPSHOT_MAX_AGE, False
+            else:
+                max_age, immutable = self.immutable_max_age, True
+            response = not_modified(request, snapshot.etag)
+            if response is None:
+                content = bytes(snapshot.content)
+                if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                    response = HttpResponse(content, content_type='application/json')
+                    response['Content-Encoding'] = 'gzip'
+                else:
+                    response = HttpResponse(gzip.decompress(content), content_type='application/json')
+                response['Content-Location'] = reverse('shared_reading_list_version', args=[share_token, snapshot.version])
+            patch_vary_headers(response, ['Accept-Encoding'])
+            return set_public_validators(response, snapshot.etag, max_age, immutable=immutable)
+        except Exception as e:
+            logger.error(f"Error serving shared reading list: {e}")
+            return Response({'error': 'Internal server error'}, status=500)
+
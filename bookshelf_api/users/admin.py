@@ -1,5 +1,28 @@
 from django.contrib import admin
-from .models import Users
+from .deletion import AccountDeletionService
+from .models import AccountDeletion, Users
 
 
-admin.site.register(Users)
\ No newline at end of file
+class UsersAdmin(admin.ModelAdmin):
+    # Deleting here schedules a background purge (manage.py purge_deleted_accounts)
+    # instead of cascading through the user's books and lists in this request
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        summary = [f"{obj} (deactivated now, data purged in the background)" for obj in objs]
+        return summary, {Users._meta.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        AccountDeletionService.request(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            AccountDeletionService.request(user)
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ['username', 'status', 'items_deleted', 'lists_deleted', 'books_deleted', 'created_at', 'finished_at']
+    list_filter = ['status']
+
+
+admin.site.register(Users, UsersAdmin)
+admin.site.register(AccountDeletion, AccountDeletionAdmin)
@@ -0,0 +1,32 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .caches import user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # JWTAuthentication reads the user row on every request; this keeps recently seen
+    # users in a process-local cache so most authenticated requests need no query.
+    # Only users that passed the active check are cached. The cache holds field values,
+    # and each request gets a new instance built from them (with its own _state and
+    # related-object caches), so views can modify request.user freely.
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        cached = user_cache.get(str(user_id)) if user_id is not None else None
+        if cached is None:
+            user = super().get_user(validated_token)
+            user_cache.set(str(user_id), (user._state.db, [getattr(user, field.attname) for field in self.fields]))
+            return user
+
+        db, values = cached
+        user = self.user_model.from_db(db, [field.attname for field in self.fields], values)
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
+
+    @property
+    def fields(self):
+        return self.user_model._meta.concrete_fields
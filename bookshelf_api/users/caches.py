@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.db import transaction
+from bookshelf_api.local_cache import TTLCache
+
+
+# User id (token claim) -> Users row, read by CachedJWTAuthentication. Entries are
+# dropped on commit of any change to the user; other processes pick it up within the TTL.
+user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_MAX_SIZE, ttl=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def forget_user(user_id):
+    transaction.on_commit(lambda: user_cache.delete(str(user_id)))
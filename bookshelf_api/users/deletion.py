@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import logging
+from books.services import BookPurgeService
+from reading_lists.models import ReadingList, ReadingListItem, ReadingListSnapshot
+from reading_lists.services import ReadingListService
+from .caches import forget_user
+from .models import AccountDeletion, Users
+
+
+logger = logging.getLogger(__name__)
+
+
+class AccountDeletionService:
+    # Deleting a user through Django's collector loads every book, list and item they
+    # own and deletes them in one long transaction. Instead the account is deactivated
+    # at once and purge_deleted_accounts removes its data in bounded chunks, each in its
+    # own short transaction, before deleting the (by then empty) user row.
+    @staticmethod
+    def request(user):
+        with transaction.atomic():
+            Users.objects.filter(pk=user.pk).update(is_active=False)
+            # update() sends no post_save, so the cached user is dropped here
+            forget_user(user.pk)
+            deletion, _ = AccountDeletion.objects.get_or_create(
+                user=user, status=AccountDeletion.Status.PENDING, defaults={'username': user.username}
+            )
+        return deletion
+
+    @staticmethod
+    def delete_chunk(queryset, chunk_size, before_delete=None):
+        # DELETE of at most `chunk_size` rows picked by primary key
+        with transaction.atomic():
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if ids:
+                chunk = queryset.model.objects.filter(pk__in=ids)
+                if before_delete:
+                    before_delete(chunk)
+                chunk.delete()
+        return len(ids)
+
+    @staticmethod
+    def purge_step(deletion, chunk_size):
+        # Runs one chunk of the next unfinished step; returns False once the account is gone
+        user_id = deletion.user_id
+        steps = [
+            # Items first so lists and books are deleted without any cascade
+            ('items_deleted', lambda: AccountDeletionService.delete_chunk(
+                ReadingListItem.objects.filter(reading_list__user_id=user_id), chunk_size
+            )),
+            # These items are on other users' lists, whose snapshots are rebuilt
+            ('items_deleted', lambda: AccountDeletionService.delete_chunk(
+                ReadingListItem.objects.filter(book__author_id=user_id), chunk_size, ReadingListService.mark_changed
+            )),
+            (None, lambda: AccountDeletionService.delete_chunk(
+                ReadingListSnapshot.objects.filter(reading_list__user_id=user_id), chunk_size
+            )),
+            ('lists_deleted', lambda: AccountDeletionService.delete_chunk(
+                ReadingList.objects.filter(user_id=user_id), chunk_size
+            )),
+            ('books_deleted', lambda: BookPurgeService.purge_author_batch(user_id, chunk_size)),
+        ]
+        if user_id is not None:
+            for counter, step in steps:
+                deleted = step()
+                if deleted:
+                    if counter:
+                        AccountDeletion.objects.filter(pk=deletion.pk).update(
+                            **{counter: F(counter) + deleted}, updated_at=timezone.now()
+                        )
+                        setattr(deletion, counter, getattr(deletion, counter) + deleted)
+                    return True
+            Users.objects.filter(pk=user_id).delete()
+
+        AccountDeletion.objects.filter(pk=deletion.pk).update(status=AccountDeletion.Status.DONE, finished_at=timezone.now())
+        deletion.status = AccountDeletion.Status.DONE
+        logger.info(f"Purged account {deletion.username}")
+        return False
+
+    @staticmethod
+    def pending():
+        return AccountDeletion.objects.filter(status=AccountDeletion.Status.PENDING).order_by('created_at')
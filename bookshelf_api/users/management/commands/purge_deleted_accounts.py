@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+import time
+from users.deletion import AccountDeletionService
+
+
+class Command(BaseCommand):
+    help = "Delete the data of accounts scheduled for deletion, in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows deleted per transaction")
+        parser.add_argument('--pause', type=float, default=0.1, help="Seconds to sleep between chunks")
+
+    def handle(self, *args, **options):
+        purged = 0
+        for deletion in AccountDeletionService.pending():
+            while AccountDeletionService.purge_step(deletion, options['chunk_size']):
+                self.stdout.write(
+                    f"{deletion.username}: {deletion.items_deleted} item(s), {deletion.lists_deleted} list(s), "
+                    f"{deletion.books_deleted} book(s) deleted"
+                )
+                time.sleep(options['pause'])
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Done: {purged} account(s) purged"))
@@ -17,3 +17,28 @@ class Users(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.email})"
 
+
+class AccountDeletion(models.Model):
+    # Work order for the background purge of an account (see users.deletion). The row
+    # outlives the user and records how far the purge got.
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        DONE = 'done', 'Done'
+
+    user = models.ForeignKey(Users, on_delete=models.SET_NULL, null=True, blank=True, related_name='deletions')
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    items_deleted = models.PositiveIntegerField(default=0)
+    lists_deleted = models.PositiveIntegerField(default=0)
+    books_deleted = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Account Deletion'
+        verbose_name_plural = 'Account Deletions'
+
+    def __str__(self):
+        return f"{self.username} ({self.status})"
+
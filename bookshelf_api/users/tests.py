@@ -1,3 +1,107 @@
-from django.test import TestCase
+from datetime import date
+from rest_framework_simplejwt.tokens import RefreshToken
+from bookshelf_api.testing import APIBudgetTestCase
+from books.models import BookFacet, Books
+from books.services import BookFacetService, BookService
+from reading_lists.models import ReadingList, ReadingListItem
+from reading_lists.services import ReadingListService
+from .authentication import CachedJWTAuthentication
+from .deletion import AccountDeletionService
+from .models import AccountDeletion, Users
+from .views import RegisterUserView, UserLoginView, UserProfileView, RefreshTokenView
 
-# Create your tests here.
+
+class UserEndpointBudgetTests(APIBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+
+    def test_register(self):
+        data = {'username': 'robert', 'email': 'robert@example.com', 'password': self.password}
+        with self.assertWithinBudget(RegisterUserView):
+            response = self.client.post('/api/register/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        with self.assertWithinBudget(UserLoginView):
+            response = self.client.post('/api/login/', {'username': 'alice', 'password': self.password}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile(self):
+        self.authenticate(self.user)
+        with self.assertWithinBudget(UserProfileView):
+            response = self.client.get('/api/profile/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertWithinBudget(UserProfileView):
+            response = self.client.patch('/api/profile/', {'email': 'alice@example.org'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertWithinBudget(UserProfileView):
+            response = self.client.patch('/api/profile/', {'username': 'alicia'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh(self):
+        refresh = self.client.post('/api/login/', {'username': 'alice', 'password': self.password}, format='json').data['refresh']
+        with self.assertWithinBudget(RefreshTokenView):
+            response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class CachedAuthenticationTests(APIBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.authenticate(self.user)
+
+    def test_profile_changes_are_seen_at_once(self):
+        self.assertEqual(self.client.get('/api/profile/').data['username'], 'alice')
+        self.client.patch('/api/profile/', {'username': 'alicia'}, format='json')
+        self.assertEqual(self.client.get('/api/profile/').data['username'], 'alicia')
+
+    def test_each_request_gets_its_own_user(self):
+        token = RefreshToken.for_user(self.user).access_token
+        authentication = CachedJWTAuthentication()
+        authentication.get_user(token)
+        first, second = authentication.get_user(token), authentication.get_user(token)
+        self.assertIsNot(first, second)
+        self.assertIsNot(first._state, second._state)
+        first.first_name = 'Changed'
+        first._state.fields_cache['reading_lists'] = []
+        self.assertEqual(second.first_name, '')
+        self.assertEqual(second._state.fields_cache, {})
+        self.assertEqual(authentication.get_user(token).first_name, '')
+
+    def test_deactivated_account_is_rejected(self):
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        AccountDeletionService.request(self.user)
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+
+class AccountDeletionTests(APIBudgetTestCase):
+    def test_purge_removes_everything_in_chunks(self):
+        user = self.create_user()
+        other = self.create_user('bob')
+        books = [
+            BookService.create_book(
+                {'title': f'Book {i}', 'pages': 10, 'genre': 'Fiction', 'published_date': date(2020, 1, 1)}, user
+            )
+            for i in range(5)
+        ]
+        own_list = ReadingList.objects.create(user=user, name='Mine')
+        ReadingListService.add_books_to_list(own_list, [book.id for book in books])
+        other_list = ReadingList.objects.create(user=other, name='Theirs')
+        ReadingListService.add_books_to_list(other_list, [book.id for book in books[:2]])
+
+        deletion = AccountDeletionService.request(user)
+        steps = 0
+        while AccountDeletionService.purge_step(deletion, chunk_size=2):
+            steps += 1
+        self.assertGreater(steps, 3)
+
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, AccountDeletion.Status.DONE)
+        self.assertEqual((deletion.items_deleted, deletion.lists_deleted, deletion.books_deleted), (7, 1, 5))
+        self.assertFalse(Users.objects.filter(pk=user.pk).exists())
+        self.assertFalse(Books.all_objects.filter(author_id=user.pk).exists())
+        self.assertFalse(ReadingListItem.objects.filter(reading_list=other_list).exists())
+        self.assertFalse(BookFacet.objects.filter(count__gt=0).exists())
+        self.assertEqual(BookFacetService.drift(), [])
@@ -22,6 +22,8 @@ def health_check(request):
 
 @permission_classes([AllowAny])
 class RegisterUserView(APIView):
+    query_budget = 6
+
     def post(self, request):
         try:
             serializer = UserRegistrationSerializer(data=request.data)
@@ -40,6 +42,8 @@ class RegisterUserView(APIView):
 
 @permission_classes([AllowAny])
 class UserLoginView(APIView):
+    query_budget = 2
+
     def post(self, request):
         try:
             serializer = UserLoginSerializer(data=request.data)
@@ -70,6 +74,9 @@ class UserLoginView(APIView):
 
 @permission_classes([IsAuthenticated])
 class UserProfileView(APIView):
+    # 6 for a username change (list items carry the author name), 3 otherwise
+    query_budget = 6
+
     def get(self, request):
         user = request.user
         serializer = UserProfileSerializer(user)
@@ -94,6 +101,8 @@ class UserProfileView(APIView):
 
 @permission_classes([AllowAny])
 class RefreshTokenView(APIView):
+    query_budget = 3
+
     def post(self, request):
         try:
             refresh_token = request.data.get('refresh')